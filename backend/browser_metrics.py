@@ -0,0 +1,153 @@
+import logging
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+
+def get_browser_pid(driver):
+    """
+    undetected_chromedriver launches Chrome itself and exposes its pid; plain Selenium
+    only knows chromedriver, whose children are the browser processes.
+    """
+    pid = getattr(driver, "browser_pid", None)
+    if pid:
+        return pid
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    return process.pid if process else None
+
+
+def _process_tree(pid):
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def browser_processes(pid) -> list:
+    """Snapshot of the browser process tree; take it before quitting, since children are reparented on exit."""
+    if psutil is None or not pid:
+        return []
+    return _process_tree(pid)
+
+
+def wait_for_exit(processes: list, timeout: float) -> bool:
+    """Waits for every process in a browser_processes() snapshot to exit. Returns False on timeout."""
+    if not processes:
+        return True
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    return not alive
+
+
+def terminate_processes(processes: list, timeout: float = 5) -> bool:
+    """Terminates, then kills, whatever is left of a browser_processes() snapshot. Returns True once all are gone."""
+    if not processes:
+        return True
+    for proc in processes:
+        try:
+            proc.terminate()
+        except psutil.Error:
+            pass
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.Error:
+            pass
+    _, alive = psutil.wait_procs(alive, timeout=timeout)
+    return not alive
+
+
+def sample_process_tree(pid) -> dict:
+    """
+    Returns RSS (bytes), CPU seconds (user + system) and open handles summed over the browser process tree,
+    or None when psutil is unavailable or the process is gone.
+    """
+    if psutil is None or not pid:
+        return None
+
+    rss = cpu = handles = 0
+    processes = _process_tree(pid)
+    for proc in processes:
+        try:
+            with proc.oneshot():
+                rss += proc.memory_info().rss
+                times = proc.cpu_times()
+                cpu += times.user + times.system
+                handles += proc.num_handles() if hasattr(proc, "num_handles") else proc.num_fds()
+        except psutil.Error:
+            continue
+
+    if not processes:
+        return None
+    return {"rss": rss, "cpu": cpu, "handles": handles, "processes": len(processes)}
+
+
+class ResourceTracker:
+    """
+    Accumulates per-message browser RSS and CPU for one campaign so resource profiles can be compared.
+    """
+
+    def __init__(self, profile: str):
+        self.profile = profile
+        self.messages = 0
+        self.cpu_seconds = 0.0
+        self.rss_total = 0
+        self.rss_peak = 0
+        self._last_cpu = None
+        if psutil is None:
+            logger.warning("psutil is not installed; browser resource usage will not be measured.")
+
+    def start(self, pid):
+        sample = sample_process_tree(pid)
+        self._last_cpu = sample["cpu"] if sample else None
+        return sample
+
+    def message_done(self, pid):
+        sample = sample_process_tree(pid)
+        if not sample:
+            return None
+
+        if self._last_cpu is not None:
+            self.cpu_seconds += max(0.0, sample["cpu"] - self._last_cpu)
+        self._last_cpu = sample["cpu"]
+        self.messages += 1
+        self.rss_total += sample["rss"]
+        self.rss_peak = max(self.rss_peak, sample["rss"])
+        return sample
+
+    def summary(self) -> dict:
+        if not self.messages:
+            return {"profile": self.profile, "messages": 0}
+        return {
+            "profile": self.profile,
+            "messages": self.messages,
+            "avg_rss_mb": round(self.rss_total / self.messages / 1024 / 1024, 1),
+            "peak_rss_mb": round(self.rss_peak / 1024 / 1024, 1),
+            "cpu_seconds_per_message": round(self.cpu_seconds / self.messages, 2),
+        }
+
+
+class MemoryWatchdog:
+    """
+    Decides when the browser has grown enough that it should be recycled before it slows down or crashes.
+    """
+
+    def __init__(self, rss_limit_mb: float, handle_limit: int):
+        self.rss_limit = rss_limit_mb * 1024 * 1024
+        self.handle_limit = handle_limit
+
+    def check(self, sample: dict):
+        """Returns why the browser should be recycled, or None."""
+        if not sample:
+            return None
+        if self.rss_limit and sample["rss"] > self.rss_limit:
+            return f"RSS {sample['rss'] / 1024 / 1024:.0f} MB over {self.rss_limit / 1024 / 1024:.0f} MB limit"
+        if self.handle_limit and sample["handles"] > self.handle_limit:
+            return f"{sample['handles']} handles over {self.handle_limit} limit"
+        return None
@@ -0,0 +1,107 @@
+import os
+import json
+import socket
+import logging
+import urllib.request
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+DEBUG_HOST = "127.0.0.1"
+
+
+def is_port_free(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind((DEBUG_HOST, port))
+            return True
+        except OSError:
+            return False
+
+
+def allocate_debug_port(preferred: int = 0) -> int:
+    """
+    Returns `preferred` if it is free, otherwise a port picked by the OS.
+    """
+    if preferred and is_port_free(preferred):
+        return preferred
+    if preferred:
+        logger.warning(f"Debugging port {preferred} is taken by another process, allocating a free one.")
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((DEBUG_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def probe_debug_endpoint(port: int, timeout: float = 0.5) -> dict:
+    """Returns Chrome's /json/version payload, or None if nothing answers on the port."""
+    try:
+        with urllib.request.urlopen(f"http://{DEBUG_HOST}:{port}/json/version", timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def load_session(path: str) -> dict:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read browser session file {path}: {e}")
+        return None
+
+
+def save_session(path: str, port: int, pid: int, user_data_dir: str, profile: str):
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"port": port, "pid": pid, "user_data_dir": user_data_dir, "profile": profile}, f)
+    except OSError as e:
+        logger.error(f"Could not save browser session file {path}: {e}")
+
+
+def clear_session(path: str):
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove browser session file {path}: {e}")
+
+
+def _pid_uses_profile(pid: int, user_data_dir: str) -> bool:
+    if psutil is None:
+        # Without psutil the session file is the only evidence; trust it
+        return True
+    if not pid:
+        return False
+    try:
+        cmdline = psutil.Process(pid).cmdline()
+    except psutil.Error:
+        return False
+    expected = os.path.normcase(os.path.abspath(user_data_dir))
+    for arg in cmdline:
+        if arg.startswith("--user-data-dir="):
+            return os.path.normcase(os.path.abspath(arg.split("=", 1)[1])) == expected
+    return False
+
+
+def find_running_browser(path: str, user_data_dir: str) -> dict:
+    """
+    Returns the recorded session if a Chrome started by us on `user_data_dir` still answers on its
+    debugging port, otherwise clears the stale record and returns None.
+    """
+    session = load_session(path)
+    if not session:
+        return None
+
+    if session.get("user_data_dir") != user_data_dir or not session.get("port"):
+        clear_session(path)
+        return None
+    if not probe_debug_endpoint(session["port"]) or not _pid_uses_profile(session.get("pid"), user_data_dir):
+        clear_session(path)
+        return None
+    return session
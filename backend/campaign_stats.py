@@ -0,0 +1,231 @@
+import os
+import json
+import math
+import time
+import threading
+import logging
+from collections import Counter
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+MAX_CAMPAIGNS = 200   # finished campaigns kept on disk
+MAX_DAYS = 90
+
+
+class CampaignExistsError(Exception):
+    """A campaign id that is already tracked was reused."""
+
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram in the style of DDSketch: O(1) inserts, bounded memory, and quantiles
+    within +/- relative_accuracy of the true value.
+    """
+
+    MIN_VALUE = 1e-3
+
+    def __init__(self, relative_accuracy: float = 0.02):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = Counter()
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if value <= self.MIN_VALUE:
+            self.zero_count += 1
+        else:
+            self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return min(self.max, 2 * self.gamma ** key / (self.gamma + 1))
+        return self.max
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3),
+            "p50": round(self.quantile(0.5), 3),
+            "p95": round(self.quantile(0.95), 3),
+            "p99": round(self.quantile(0.99), 3),
+            "max": round(self.max, 3),
+        }
+
+    def to_dict(self) -> dict:
+        return {"gamma": self.gamma, "buckets": {str(k): v for k, v in self.buckets.items()},
+                "zero_count": self.zero_count, "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        sketch = cls()
+        sketch.gamma = data["gamma"]
+        sketch._log_gamma = math.log(sketch.gamma)
+        sketch.buckets = Counter({int(k): v for k, v in data["buckets"].items()})
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.max = data["max"]
+        return sketch
+
+
+class Aggregate:
+    """Running totals for one campaign or one day. Every update is O(1)."""
+
+    def __init__(self):
+        self.outcomes = Counter()
+        self.errors = Counter()
+        self.skipped = Counter()
+        self.sent_per_hour = Counter()
+        self.latency = {}   # "message" or stage name -> QuantileSketch
+
+    def add_message(self, outcome: str, seconds: float, stage_seconds: dict, error: str, finished_at: float):
+        self.outcomes[outcome] += 1
+        if error:
+            self.errors[error] += 1
+        if outcome == "sent":
+            self.sent_per_hour[time.strftime("%Y-%m-%dT%H:00", time.localtime(finished_at))] += 1
+        self.latency.setdefault("message", QuantileSketch()).add(seconds)
+        for stage, value in stage_seconds.items():
+            self.latency.setdefault(stage, QuantileSketch()).add(value)
+
+    def to_report(self) -> dict:
+        return {
+            "outcomes": dict(self.outcomes),
+            "errors": dict(self.errors),
+            "skipped": dict(self.skipped),
+            "latency_seconds": {name: sketch.summary() for name, sketch in self.latency.items()},
+            "sent_per_hour": dict(sorted(self.sent_per_hour.items())),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "outcomes": dict(self.outcomes), "errors": dict(self.errors), "skipped": dict(self.skipped),
+            "sent_per_hour": dict(self.sent_per_hour),
+            "latency": {name: sketch.to_dict() for name, sketch in self.latency.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        aggregate = cls()
+        aggregate.outcomes = Counter(data["outcomes"])
+        aggregate.errors = Counter(data["errors"])
+        aggregate.skipped = Counter(data["skipped"])
+        aggregate.sent_per_hour = Counter(data["sent_per_hour"])
+        aggregate.latency = {name: QuantileSketch.from_dict(s) for name, s in data["latency"].items()}
+        return aggregate
+
+
+class CampaignAnalytics:
+    """
+    Keeps running aggregates per campaign and per day, updated as each message finishes, so stats
+    queries never scan logs or results. Snapshots are written to disk when a campaign finishes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.campaigns = {}   # id -> {"info": {...}, "aggregate": Aggregate}
+        self.days = {}        # "YYYY-MM-DD" -> Aggregate
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for campaign_id, entry in data.get("campaigns", {}).items():
+                self.campaigns[campaign_id] = {"info": entry["info"], "aggregate": Aggregate.from_dict(entry["aggregate"])}
+            for day, aggregate in data.get("days", {}).items():
+                self.days[day] = Aggregate.from_dict(aggregate)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read campaign stats {self.path}: {e}. Starting empty.")
+
+    def _save(self):
+        finished = [c for c in self.campaigns.items() if c[1]["info"]["status"] != "running"]
+        finished.sort(key=lambda c: c[1]["info"]["started_at"])
+        for campaign_id, _ in finished[:-MAX_CAMPAIGNS]:
+            del self.campaigns[campaign_id]
+        for day in sorted(self.days)[:-MAX_DAYS]:
+            del self.days[day]
+
+        data = {
+            "campaigns": {cid: {"info": c["info"], "aggregate": c["aggregate"].to_dict()} for cid, c in self.campaigns.items()},
+            "days": {day: aggregate.to_dict() for day, aggregate in self.days.items()},
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not persist campaign stats {self.path}: {e}")
+
+    def start_campaign(self, campaign_id: str, total_rows: int, planned: int, skipped: list):
+        day = time.strftime("%Y-%m-%d", time.localtime())
+        with self._lock:
+            if campaign_id in self.campaigns:
+                raise CampaignExistsError(f"Campaign '{campaign_id}' already exists. Use a new id or omit it.")
+            aggregate = Aggregate()
+            day_aggregate = self.days.setdefault(day, Aggregate())
+            for entry in skipped:
+                aggregate.skipped[entry["reason"]] += 1
+                day_aggregate.skipped[entry["reason"]] += 1
+            self.campaigns[campaign_id] = {
+                "info": {"id": campaign_id, "status": "running", "started_at": time.time(), "finished_at": None,
+                         "total_rows": total_rows, "planned": planned},
+                "aggregate": aggregate,
+            }
+
+    def record_message(self, campaign_id: str, outcome: str, seconds: float, stage_seconds: dict = None, error: str = None):
+        now = time.time()
+        day = time.strftime("%Y-%m-%d", time.localtime(now))
+        with self._lock:
+            self.campaigns[campaign_id]["aggregate"].add_message(outcome, seconds, stage_seconds or {}, error, now)
+            self.days.setdefault(day, Aggregate()).add_message(outcome, seconds, stage_seconds or {}, error, now)
+
+    def finish_campaign(self, campaign_id: str, status: str = "finished"):
+        with self._lock:
+            self.campaigns[campaign_id]["info"]["status"] = status
+            self.campaigns[campaign_id]["info"]["finished_at"] = time.time()
+            self._save()
+
+    def campaign_report(self, campaign_id: str) -> dict:
+        with self._lock:
+            campaign = self.campaigns.get(campaign_id)
+            if campaign is None:
+                return None
+            info = dict(campaign["info"])
+            report = campaign["aggregate"].to_report()
+
+        elapsed = (info["finished_at"] or time.time()) - info["started_at"]
+        done = sum(report["outcomes"].values())
+        info["processed"] = done
+        info["messages_per_hour"] = round(done / elapsed * 3600, 1) if elapsed > 0 else None
+        return {**info, **report}
+
+    def list_campaigns(self) -> list:
+        with self._lock:
+            infos = [dict(c["info"], outcomes=dict(c["aggregate"].outcomes)) for c in self.campaigns.values()]
+        return sorted(infos, key=lambda info: info["started_at"], reverse=True)
+
+    def daily_report(self, days: int = 7) -> dict:
+        with self._lock:
+            return {day: self.days[day].to_report() for day in sorted(self.days)[-days:]}
@@ -0,0 +1,95 @@
+import os
+import struct
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+# Fixed-width record: 16-byte (phone, message, media) digest, 16-byte phone digest, float64 send time
+RECORD = struct.Struct("<16s16sd")
+
+NEW = "new"
+DELIVERED = "already_delivered"
+CHANGED = "changed"
+
+
+def digest(*parts: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.digest()
+
+
+def file_digest(path: str) -> str:
+    """Content hash of a media file, so a replaced attachment counts as a changed message."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DeliveryIndex:
+    """
+    Remembers which (phone, rendered message, media) combinations were delivered, across campaigns.
+    Records are appended to a fixed-width binary file (40 bytes each) and held in dicts, so lookups
+    are O(1) and a million deliveries take about 40 MB on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._delivered = {}   # pair digest -> send time
+        self._latest = {}      # phone digest -> pair digest of the last delivery
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"Could not read delivery index {self.path}: {e}. Starting empty.")
+            return
+
+        usable = len(data) - len(data) % RECORD.size
+        if usable != len(data):
+            # Cut it off, or every record appended after it would be read misaligned
+            logger.warning(f"Delivery index {self.path} ends with a partial record; truncating it.")
+            try:
+                os.truncate(self.path, usable)
+            except OSError as e:
+                logger.error(f"Could not truncate delivery index {self.path}: {e}")
+        for pair, phone, sent_at in RECORD.iter_unpack(data[:usable]):
+            self._delivered[pair] = sent_at
+            self._latest[phone] = pair
+
+    def classify(self, phone: str, message: str, media_hash: str = "") -> str:
+        pair = digest(phone, message, media_hash)
+        with self._lock:
+            if pair in self._delivered:
+                return DELIVERED
+            if digest(phone) in self._latest:
+                return CHANGED
+            return NEW
+
+    def record(self, phone: str, message: str, media_hash: str = ""):
+        pair = digest(phone, message, media_hash)
+        phone_key = digest(phone)
+        sent_at = time.time()
+        with self._lock:
+            self._delivered[pair] = sent_at
+            self._latest[phone_key] = pair
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write(RECORD.pack(pair, phone_key, sent_at))
+            except OSError as e:
+                logger.error(f"Could not append to delivery index {self.path}: {e}")
+
+    def __len__(self):
+        return len(self._delivered)
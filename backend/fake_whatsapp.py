@@ -0,0 +1,220 @@
+"""
+Local stand-in for WhatsApp Web that reproduces the DOM contract whatsapp_sender.py relies on:
+the logged-in chat list, /send?phone=... chats with the "Type a message" composer, the invalid
+number popup, the attach button variants, the file inputs and the aria-label="Send" button.
+
+Latencies and failure modes are configurable so load_harness.py can exercise the sender offline.
+
+    python fake_whatsapp.py --port 8765 --chat-latency 300 --invalid-rate 0.1
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+ATTACH_VARIANTS = {
+    "button": '<button title="Attach" id="attach">+</button>',
+    "div": '<div title="Attach" id="attach" role="button">+</div>',
+    "clip": '<div id="attach"><span data-icon="clip">+</span></div>',
+}
+
+CHAT_LIST_PAGE = """<!DOCTYPE html>
+<html><head><title>WhatsApp</title></head>
+<body>
+<div id="app"></div>
+<script>
+setTimeout(function () {
+    document.getElementById("app").innerHTML = '<div contenteditable="true" data-tab="3">Search</div>';
+}, %(login_latency)d);
+</script>
+</body></html>
+"""
+
+CHAT_PAGE = """<!DOCTYPE html>
+<html><head><title>WhatsApp</title></head>
+<body>
+<div id="app"></div>
+<script>
+var config = %(config)s;
+
+function record(kind, text, file) {
+    fetch("/api/sent", {method: "POST", body: JSON.stringify({phone: config.phone, kind: kind, text: text, file: file})});
+}
+
+function showInvalidPopup() {
+    document.getElementById("app").innerHTML =
+        '<div role="dialog"><div>Phone number shared via url is invalid.</div><button>OK</button></div>';
+}
+
+function showChat() {
+    var app = document.getElementById("app");
+    app.innerHTML = '<footer>' + config.attach_html +
+        '<div contenteditable="true" title="Type a message" data-tab="10" id="composer"></div></footer>' +
+        '<div id="attach-menu"></div><div id="preview"></div>';
+
+    var composer = document.getElementById("composer");
+    composer.addEventListener("keydown", function (event) {
+        if (event.key === "Enter" && !event.shiftKey) {
+            event.preventDefault();
+            record("text", composer.innerText, null);
+            composer.innerText = "";
+        }
+    });
+
+    var attach = document.getElementById("attach");
+    if (config.attach_missing) {
+        attach.remove();
+        return;
+    }
+    attach.addEventListener("click", function () {
+        setTimeout(function () {
+            document.getElementById("attach-menu").innerHTML =
+                '<input type="file" accept="image/*,video/mp4,video/3gpp,video/quicktime">' +
+                '<input type="file" accept="*">';
+            document.querySelectorAll("#attach-menu input").forEach(function (input) {
+                input.addEventListener("change", function () {
+                    var name = input.files.length ? input.files[0].name : null;
+                    setTimeout(function () {
+                        var preview = document.getElementById("preview");
+                        preview.innerHTML = '<div role="button" aria-label="Send">Send</div>';
+                        preview.firstChild.addEventListener("click", function () {
+                            record("media", composer.innerText, name);
+                            composer.innerText = "";
+                            preview.innerHTML = "";
+                        });
+                    }, config.send_latency);
+                });
+            });
+        }, config.attach_latency);
+    });
+}
+
+setTimeout(function () {
+    if (config.outcome === "invalid") {
+        showInvalidPopup();
+    } else if (config.outcome === "ok") {
+        showChat();
+    }
+    // "hang": never render anything, the sender's chat wait times out
+}, config.chat_latency);
+</script>
+</body></html>
+"""
+
+
+class FakeWhatsAppState:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.sent = []
+        self.chats_opened = 0
+
+    def jitter(self, latency_ms: int) -> int:
+        spread = latency_ms * self.args.jitter
+        return max(0, int(random.uniform(latency_ms - spread, latency_ms + spread)))
+
+    def chat_config(self, phone: str) -> dict:
+        roll = random.random()
+        if phone.endswith(self.args.invalid_suffix) or roll < self.args.invalid_rate:
+            outcome = "invalid"
+        elif roll < self.args.invalid_rate + self.args.hang_rate:
+            outcome = "hang"
+        else:
+            outcome = "ok"
+
+        return {
+            "phone": phone,
+            "outcome": outcome,
+            "chat_latency": self.jitter(self.args.chat_latency),
+            "attach_latency": self.jitter(self.args.attach_latency),
+            "send_latency": self.jitter(self.args.send_latency),
+            "attach_html": ATTACH_VARIANTS[self.args.attach_variant],
+            "attach_missing": random.random() < self.args.attach_missing_rate,
+        }
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "chats_opened": self.chats_opened,
+                "messages": sum(1 for m in self.sent if m["kind"] == "text"),
+                "media": sum(1 for m in self.sent if m["kind"] == "media"),
+            }
+
+
+def make_handler(state: FakeWhatsAppState):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body: str, content_type: str = "text/html; charset=utf-8", status: int = 200):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == "/":
+                self._send(CHAT_LIST_PAGE % {"login_latency": state.jitter(state.args.login_latency)})
+            elif parsed.path == "/send":
+                phone = parse_qs(parsed.query).get("phone", [""])[0]
+                with state.lock:
+                    state.chats_opened += 1
+                self._send(CHAT_PAGE % {"config": json.dumps(state.chat_config(phone))})
+            elif parsed.path == "/api/stats":
+                self._send(json.dumps(state.stats()), "application/json")
+            else:
+                self._send("not found", "text/plain", 404)
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/api/sent":
+                self._send("not found", "text/plain", 404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            payload["received_at"] = time.time()
+            with state.lock:
+                state.sent.append(payload)
+            self._send("{}", "application/json")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--login-latency", type=int, default=500, help="ms until the chat list renders")
+    parser.add_argument("--chat-latency", type=int, default=300, help="ms until a chat or the invalid popup renders")
+    parser.add_argument("--attach-latency", type=int, default=100, help="ms until the file inputs appear")
+    parser.add_argument("--send-latency", type=int, default=200, help="ms until the media Send button appears")
+    parser.add_argument("--jitter", type=float, default=0.3, help="relative +/- spread applied to every latency")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="fraction of chats showing the invalid number popup")
+    parser.add_argument("--invalid-suffix", default="0000", help="numbers ending in this are always invalid")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of chats that never render")
+    parser.add_argument("--attach-missing-rate", type=float, default=0.0, help="fraction of chats without an attach button")
+    parser.add_argument("--attach-variant", choices=sorted(ATTACH_VARIANTS), default="button")
+
+
+def start_server(args) -> tuple:
+    """Starts the stand-in on a background thread. Returns (server, state)."""
+    state = FakeWhatsAppState(args)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local WhatsApp Web stand-in")
+    add_arguments(parser)
+    args = parser.parse_args()
+    server, _ = start_server(args)
+    print(f"Fake WhatsApp Web listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -5,8 +5,8 @@ a = Analysis(
     ['run_server.py'],
     pathex=[],
     binaries=[],
-    datas=[('whatsapp_sender.py', '.')],
-    hiddenimports=[],
+    datas=[('whatsapp_sender.py', '.'), ('number_cache.py', '.'), ('timeouts.py', '.'), ('profile_maintenance.py', '.'), ('browser_metrics.py', '.'), ('browser_session.py', '.'), ('profiling.py', '.'), ('delivery_index.py', '.'), ('campaign_stats.py', '.'), ('log_reader.py', '.'), ('media_library.py', '.'), ('serving.py', '.')],
+    hiddenimports=['orjson', 'uvicorn.loops.uvloop', 'uvicorn.protocols.http.httptools_impl'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
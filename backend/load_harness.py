@@ -0,0 +1,121 @@
+"""
+Runs full campaigns through whatsapp_sender.py against the local stand-in from fake_whatsapp.py
+in headless Chrome and reports throughput, per-stage latency and browser resource use.
+
+    python load_harness.py --messages 100 --delay 0,0 --invalid-rate 0.1
+    python load_harness.py --messages 20 --media sample.jpg --browser-profile lean --json
+
+Everything runs in a throwaway data dir, so the real profile, caches and stats are never touched.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+import fake_whatsapp
+
+
+def percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def build_contacts(count: int):
+    import pandas as pd
+    rows = [{
+        "phone": f"91{random.randint(7000000000, 9999999999)}",
+        "name": f"Contact {i}",
+        "order": f"ORD-{1000 + i}",
+    } for i in range(count)]
+    return pd.DataFrame(rows)
+
+
+def run(args) -> dict:
+    server, state = fake_whatsapp.start_server(args)
+    data_dir = tempfile.mkdtemp(prefix="wa_bomb_load_")
+
+    # whatsapp_sender reads its configuration at import time
+    os.environ["WHATSAPP_WEB_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["DELAY_BETWEEN_MESSAGES"] = args.delay
+    os.environ["WA_BOMB_DATA_DIR"] = data_dir
+    os.environ["BROWSER_PROFILE"] = args.browser_profile
+    import whatsapp_sender
+
+    try:
+        # The stand-in needs no QR scan, so hidden profiles may be used straight away
+        with open(whatsapp_sender.LOGIN_MARKER_PATH, "w") as f:
+            f.write("load harness")
+
+        df = build_contacts(args.messages)
+        media_path = os.path.abspath(args.media) if args.media else None
+
+        started = time.monotonic()
+        summary = whatsapp_sender.send_messages_with_variables(df, args.template, ["name", "order"], media_path)
+        elapsed = time.monotonic() - started
+
+        stages = {}
+        for stage in whatsapp_sender.stage_timeouts.stages:
+            samples = whatsapp_sender.stage_timeouts.samples(stage)
+            if samples:
+                stages[stage] = {
+                    "count": len(samples),
+                    "p50": round(percentile(samples, 0.5), 3),
+                    "p95": round(percentile(samples, 0.95), 3),
+                    "max": round(max(samples), 3),
+                }
+
+        return {
+            "messages": args.messages,
+            "elapsed_seconds": round(elapsed, 1),
+            "messages_per_minute": round(args.messages / elapsed * 60, 1) if elapsed else None,
+            "seconds_per_message": round(elapsed / args.messages, 2) if args.messages else None,
+            "outcomes": {k: v for k, v in summary.items() if k != "resources"},
+            "resources": summary.get("resources"),
+            "stand_in": state.stats(),
+            "stages": stages,
+        }
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f"Data dir kept at {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def print_report(report: dict):
+    print(f"\nMessages: {report['messages']} in {report['elapsed_seconds']}s "
+          f"({report['messages_per_minute']} msg/min, {report['seconds_per_message']} s/msg)")
+    print(f"Outcomes: {report['outcomes']}")
+    print(f"Stand-in saw: {report['stand_in']}")
+    print(f"Browser resources: {report['resources']}")
+    print("Stage latency (s):")
+    for stage, stats in report["stages"].items():
+        print(f"  {stage:<11} n={stats['count']:<5} p50={stats['p50']:<7} p95={stats['p95']:<7} max={stats['max']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load harness for whatsapp_sender.py")
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--template", default="Hello {name},\nyour order {order} is ready.")
+    parser.add_argument("--media", help="file to attach to every message")
+    parser.add_argument("--delay", default="0,0", help="inter-message delay in seconds: a range such as 5,15 or a single value")
+    parser.add_argument("--browser-profile", default="headless", help="full, lean, offscreen or headless")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary data dir")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    fake_whatsapp.add_arguments(parser)
+    parser.set_defaults(port=0)
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import bisect
+import threading
+import logging
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+BLOCK_SIZE = 64 * 1024
+INDEX_INTERVAL = 64 * 1024      # bytes between timestamp checkpoints in the sidecar index
+MAX_READ_BYTES = 1024 * 1024    # per follow / range call
+
+# "2025-06-06 22:12:33,123 - INFO - ..." (run_server adds the logger name after the level)
+RECORD_HEADER = re.compile(rb"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d{3} - ([A-Z]+) - ")
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+
+def normalize_time(value: str) -> str:
+    """Accepts "2025-06-06T22:12" style input; log timestamps compare as plain strings."""
+    return value.replace("T", " ").strip() if value else None
+
+
+def _reverse_lines(path: str, end: int):
+    """Yields complete lines from `end` backwards without reading the rest of the file."""
+    with open(path, "rb") as f:
+        position = end
+        remainder = b""
+        while position > 0:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b"\n")
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                yield line.rstrip(b"\r")
+        if remainder:
+            yield remainder.rstrip(b"\r")
+
+
+def _forward_lines(path: str, start: int, max_bytes: int = MAX_READ_BYTES):
+    """Yields (offset after the line, line) for complete lines from `start`."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if not line.endswith(b"\n") or offset - start > max_bytes:
+                break
+            offset += len(line)
+            yield offset, line.rstrip(b"\r\n")
+
+
+class LogReader:
+    """
+    Tails, follows and searches the RotatingFileHandler set app.log, app.log.1 ... app.log.N.
+    Tails seek from the end, so the cost depends on the lines returned, not the log size. Time
+    ranges use a sidecar index of (offset, timestamp) checkpoints that is extended incrementally.
+    Cursors are (file id, byte offset) pairs that stay valid across rotation.
+    """
+
+    def __init__(self, log_path: str, backup_count: int = 5):
+        self.log_path = log_path
+        self.backup_count = backup_count
+        self.index_path = log_path + ".idx"
+        self._index_lock = threading.Lock()
+
+    def _files(self) -> list:
+        """Existing log files, oldest first, as (path, file id, size)."""
+        paths = [f"{self.log_path}.{n}" for n in range(self.backup_count, 0, -1)] + [self.log_path]
+        files = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, f"{stat.st_dev}-{stat.st_ino}", stat.st_size))
+        return files
+
+    def cursor(self) -> dict:
+        """Cursor pointing at the current end of the log."""
+        files = self._files()
+        if not files:
+            return {"file": None, "offset": 0}
+        path, file_id, size = files[-1]
+        return {"file": file_id, "offset": size}
+
+    @staticmethod
+    def _matches(header, level: str, since: str, until: str) -> bool:
+        if header is None:
+            return level is None and since is None and until is None
+        timestamp = header.group(1).decode()
+        if since and timestamp < since:
+            return False
+        if until and timestamp > until:
+            return False
+        if level and LEVELS.get(header.group(2).decode(), 0) < LEVELS.get(level, 0):
+            return False
+        return True
+
+    def tail(self, lines: int = 200, level: str = None, until: str = None) -> list:
+        """Returns the last `lines` records (oldest first), optionally at or above a level and before `until`."""
+        until = normalize_time(until)
+        records = []
+        for path, file_id, size in reversed(self._files()):
+            end = size
+            if until:
+                start_offset = self._offset_for(path, file_id, size, until, after=True)
+                if start_offset is None:
+                    continue
+                end = start_offset
+            pending = []
+            for line in _reverse_lines(path, end):
+                if not line:
+                    continue
+                header = RECORD_HEADER.match(line)
+                if header is None:
+                    pending.append(line)
+                    continue
+                if self._matches(header, level, None, until):
+                    records.append(b"\n".join([line] + pending[::-1]).decode("utf-8", "replace"))
+                    if len(records) >= lines:
+                        return records[::-1]
+                pending = []
+        return records[::-1]
+
+    def read_range(self, since: str, until: str = None, level: str = None, limit: int = 200) -> dict:
+        """Returns up to `limit` records from `since` onwards, plus a cursor to continue from."""
+        since, until = normalize_time(since), normalize_time(until)
+        files = self._files()
+        for position, (path, file_id, size) in enumerate(files):
+            start = self._offset_for(path, file_id, size, since, after=False)
+            if start is None:
+                continue
+            return self._read_forward(files[position:], start, level, since, until, limit)
+        return {"lines": [], "cursor": self.cursor()}
+
+    def follow(self, file_id: str, offset: int, level: str = None, limit: int = 1000) -> dict:
+        """Returns records written after the cursor and the cursor to pass next time."""
+        files = self._files()
+        ids = [f[1] for f in files]
+        if file_id in ids:
+            position = ids.index(file_id)
+            start = offset if offset <= files[position][2] else 0
+            return self._read_forward(files[position:], start, level, None, None, limit)
+        # The cursor's file was rotated out entirely; restart from the oldest one we still have
+        result = self._read_forward(files, 0, level, None, None, limit)
+        result["gap"] = True
+        return result
+
+    def _read_forward(self, files: list, start: int, level: str, since: str, until: str, limit: int) -> dict:
+        records = []
+        cursor = {"file": files[0][1] if files else None, "offset": start}
+
+        def result():
+            return {"lines": [b"\n".join(r).decode("utf-8", "replace") for r in records], "cursor": cursor}
+
+        for path, file_id, size in files:
+            cursor = {"file": file_id, "offset": start}
+            current = None
+            for end_offset, line in _forward_lines(path, start):
+                header = RECORD_HEADER.match(line)
+                if header is not None:
+                    if (until and header.group(1).decode() > until) or len(records) >= limit:
+                        return result()
+                    current = [line] if self._matches(header, level, since, until) else None
+                    if current is not None:
+                        records.append(current)
+                elif current is not None:
+                    current.append(line)
+                cursor = {"file": file_id, "offset": end_offset}
+            if cursor["offset"] < size:
+                # Stopped at MAX_READ_BYTES (or a partly written line); continue from the cursor next call
+                return result()
+            start = 0
+        return result()
+
+    # --- sidecar index ---
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: dict):
+        try:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"Could not save log index {self.index_path}: {e}")
+
+    def _checkpoints(self, path: str, file_id: str, size: int) -> list:
+        """(offset, timestamp) checkpoints for one file, extending the stored index over new bytes only."""
+        with self._index_lock:
+            index = self._load_index()
+            entry = index.get(file_id, {"indexed_to": 0, "checkpoints": []})
+            if entry["indexed_to"] > size:
+                entry = {"indexed_to": 0, "checkpoints": []}
+
+            if entry["indexed_to"] < size:
+                checkpoints = entry["checkpoints"]
+                last = checkpoints[-1][0] if checkpoints else -INDEX_INTERVAL
+                line_start = entry["indexed_to"]
+                for end_offset, line in _forward_lines(path, line_start, max_bytes=size):
+                    header = RECORD_HEADER.match(line)
+                    if header is not None and line_start - last >= INDEX_INTERVAL:
+                        checkpoints.append([line_start, header.group(1).decode()])
+                        last = line_start
+                    line_start = end_offset
+                entry["indexed_to"] = line_start
+
+                live_ids = {f[1] for f in self._files()}
+                index = {k: v for k, v in index.items() if k in live_ids}
+                index[file_id] = entry
+                self._save_index(index)
+            return entry["checkpoints"]
+
+    def _offset_for(self, path: str, file_id: str, size: int, timestamp: str, after: bool) -> int:
+        """
+        Byte offset to start reading from to find records at `timestamp`, or None if the whole file
+        is on the wrong side of it. after=True is used for reading backwards from `timestamp`.
+        """
+        checkpoints = self._checkpoints(path, file_id, size)
+        if not checkpoints:
+            return None if not after else size
+        times = [c[1] for c in checkpoints]
+        if after:
+            if times[0] > timestamp:
+                return None
+            position = bisect.bisect_right(times, timestamp)
+            return checkpoints[position][0] if position < len(checkpoints) else size
+        position = bisect.bisect_right(times, timestamp) - 1
+        if position < 0:
+            return checkpoints[0][0]
+        if position == len(checkpoints) - 1 and self._last_timestamp(path, size) < timestamp:
+            return None
+        return checkpoints[position][0]
+
+    @staticmethod
+    def _last_timestamp(path: str, size: int) -> str:
+        for line in _reverse_lines(path, size):
+            header = RECORD_HEADER.match(line)
+            if header is not None:
+                return header.group(1).decode()
+        return ""
@@ -7,16 +7,24 @@ import subprocess
 import hashlib
 import asyncio
 import sys
+import time
 import requests
 
 from typing import List, Optional
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, status
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 import logging
 from appdirs import user_data_dir
+import profile_maintenance
+import profiling
+import serving
+from serving import JSONResponse
+from log_reader import LogReader, LEVELS
+from media_library import MediaReferenceError
+from campaign_stats import CampaignExistsError
 
 APP_AUTHOR = "YourCompany"
 APP_NAME = "CampaignFlow"
@@ -54,7 +62,8 @@ async def lifespan(app: FastAPI):
     logger.info("FastAPI app proceeding with final cleanup and exit.")
     sys.exit(0) # Explicitly exit the process after graceful attempts
 
-app = FastAPI()
+app = FastAPI(default_response_class=JSONResponse)
+serving.configure_app(app)
 
 app.add_middleware(
     CORSMiddleware,
@@ -64,6 +73,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    """
+    Adds a Server-Timing header with the parse/render/browser/network time spent on the request.
+    """
+    timings = profiling.start_request_timing()
+    started = time.perf_counter()
+    response = await call_next(request)
+    response.headers["Server-Timing"] = profiling.server_timing_header(timings, (time.perf_counter() - started) * 1000)
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
 if os.name == 'nt': # Check if the operating system is Windows
     app_data_dir = os.getenv('LOCALAPPDATA')
     if app_data_dir is None: # Fallback in case LOCALAPPDATA env var is not set (unlikely on modern Windows)
@@ -83,6 +104,16 @@ except OSError as e:
 
 ACTIVATION_FILE = os.path.join(APP_DATA_PATH, "whatsapp-activation.txt")
 
+# Same data dir (and WA_BOMB_DATA_DIR override) as whatsapp_sender.py, without importing Selenium here
+APP_DATA_DIR = os.environ.get("WA_BOMB_DATA_DIR") or user_data_dir(APP_NAME, APP_AUTHOR)
+
+profiling.profile_dir = os.path.join(APP_DATA_DIR, "profiles")
+
+# Same rotated set whatsapp_sender.py writes (5 x 5 MB)
+LOG_FILE_PATH = os.path.join(APP_DATA_DIR, "app.log")
+log_reader = LogReader(LOG_FILE_PATH, backup_count=5)
+LOG_FOLLOW_POLL_INTERVAL = 0.5
+
 
 class ActivationRequest(BaseModel):
     motherboardSerial: str
@@ -193,7 +224,8 @@ async def activate_system_endpoint(request: ActivationRequest):
 
     try:
         logger.info(f"Pre-checking activation status with API: {ACTIVATION_API_URL}")
-        response = requests.post(ACTIVATION_API_URL, json=api_payload)
+        with profiling.measure("network"):
+            response = requests.post(ACTIVATION_API_URL, json=api_payload)
         response.raise_for_status() 
         api_response_data = response.json()
         logger.info(f"API Pre-check Response: {api_response_data}")
@@ -264,8 +296,13 @@ async def activate_system_endpoint(request: ActivationRequest):
     
 @app.get("/check-activation")
 async def check_activation_endpoint():
-    motherboard_serial = get_motherboard_serial()
-    processor_id = get_processor_id()
+    with profiling.profiled("check-activation"):
+        return await check_activation()
+
+async def check_activation():
+    with profiling.measure("sysinfo"):
+        motherboard_serial = get_motherboard_serial()
+        processor_id = get_processor_id()
     appName = "WA BOMB"
 
     # Initialize variables for the response
@@ -304,7 +341,8 @@ async def check_activation_endpoint():
 
     try:
         logger.info(f"Sending activation check request to: {ACTIVATION_API_URL} with payload: {payload}")
-        response = requests.post(ACTIVATION_API_URL, json=payload, timeout=10) # Added timeout
+        with profiling.measure("network"):
+            response = requests.post(ACTIVATION_API_URL, json=payload, timeout=10) # Added timeout
 
         api_response_data = {}
         try:
@@ -503,10 +541,20 @@ async def check_activation_endpoint():
             "localKeyMessage": local_key_message
         }
         
-USER_DATA_DIR = os.path.join(user_data_dir(APP_NAME, APP_AUTHOR), "selenium_profile")
+USER_DATA_DIR = os.path.join(APP_DATA_DIR, "selenium_profile")
 
 @app.post("/logout")
 async def logout_endpoint():
+    # Campaigns run in a worker thread; never delete the profile under a running browser
+    from whatsapp_sender import browser_lock
+    if not browser_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A campaign is using the browser. Log out once it has finished.")
+    try:
+        return logout()
+    finally:
+        browser_lock.release()
+
+def logout():
     if os.path.exists(ACTIVATION_FILE):
         try:
             os.remove(ACTIVATION_FILE)
@@ -528,6 +576,34 @@ async def logout_endpoint():
 
     return JSONResponse(content={"success": True, "message": "Logged out successfully. WhatsApp session data cleared."})
 
+@app.get("/profile/stats")
+async def profile_stats_endpoint():
+    """
+    Report the Selenium profile size by category (bytes)
+    """
+    return JSONResponse({
+        "status": "success",
+        "inUse": profile_maintenance.is_profile_in_use(USER_DATA_DIR),
+        "sizes": profile_maintenance.measure_profile(USER_DATA_DIR)
+    })
+
+@app.post("/profile/maintenance")
+async def profile_maintenance_endpoint(measure_startup: bool = False):
+    """
+    Prune regenerable browser caches from the Selenium profile while the browser is closed.
+    With measure_startup, Chrome is launched once before and once after pruning to time it.
+    """
+    from whatsapp_sender import maintain_profile
+    try:
+        report = maintain_profile(measure_startup)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Profile maintenance failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Profile maintenance failed: {e}")
+
+    return JSONResponse({"status": "success", **report})
+
 @app.post("/preview-csv")
 async def preview_csv_endpoint(
     csv_file: UploadFile = File(..., description="CSV file to preview")
@@ -535,6 +611,10 @@ async def preview_csv_endpoint(
     """
     Preview the uploaded CSV file and return column names and first few rows
     """
+    with profiling.profiled("preview-csv"):
+        return await preview_csv(csv_file)
+
+async def preview_csv(csv_file: UploadFile):
     if not csv_file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="Uploaded file is not a CSV.")
     
@@ -546,25 +626,27 @@ async def preview_csv_endpoint(
         with open(csv_path, "wb") as f:
             f.write(await csv_file.read())
 
-        try:
-            df = pd.read_csv(csv_path, encoding='utf-8')
-        except UnicodeDecodeError:
+        with profiling.measure("parse"):
             try:
-                df = pd.read_csv(csv_path, encoding='latin1')
+                df = pd.read_csv(csv_path, encoding='utf-8')
+            except UnicodeDecodeError:
+                try:
+                    df = pd.read_csv(csv_path, encoding='latin1')
+                except Exception as e:
+                    raise HTTPException(status_code=422, detail=f"Failed to parse CSV with fallback encoding: {e}")
             except Exception as e:
-                raise HTTPException(status_code=422, detail=f"Failed to parse CSV with fallback encoding: {e}")
-        except Exception as e:
-            raise HTTPException(status_code=422, detail=f"Failed to parse CSV: {e}")
+                raise HTTPException(status_code=422, detail=f"Failed to parse CSV: {e}")
 
-        columns = df.columns.tolist()
-        preview_data = df.head(10).fillna("").to_dict('records')
-        
-        return JSONResponse({
-            "status": "success",
-            "columns": columns,
-            "preview": preview_data,
-            "total_rows": len(df)
-        })
+        with profiling.measure("render"):
+            columns = df.columns.tolist()
+            preview_data = df.head(10).fillna("").to_dict('records')
+            
+            return JSONResponse({
+                "status": "success",
+                "columns": columns,
+                "preview": preview_data,
+                "total_rows": len(df)
+            })
 
     except HTTPException:
         raise
@@ -583,25 +665,38 @@ async def send_messages_endpoint(
     message: str = Form(..., description="Message template with variables like {name}"),
     csv_file: UploadFile = File(..., description="CSV with contact data"),
     variables: str = Form(..., description="JSON list of variable names used in template"),
-    media_file: UploadFile = File(None, description="Optional media file to send to all contacts.")
+    media_file: UploadFile = File(None, description="Optional media file to send to all contacts."),
+    media_column: Optional[str] = Form(None, description="CSV column with a per-contact file path or archive.zip:member; per-contact attachments are off unless set"),
+    media_archive: UploadFile = File(None, description="Optional zip of per-contact files referenced by name in the media column"),
+    browser_profile: Optional[str] = Form(None, description="Browser resource profile: full, lean, offscreen or headless"),
+    resend_delivered: bool = Form(False, description="Also send rows whose exact message was already delivered"),
+    campaign_id: Optional[str] = Form(None, description="Id to track this campaign under /campaigns; generated if omitted")
 ):
+    with profiling.profiled("send-messages"):
+        return await send_messages(message, csv_file, variables, media_file, media_column, media_archive,
+                                   browser_profile, resend_delivered, campaign_id)
+
+def parse_variables(variables: str) -> list:
     try:
-        variable_list = json.loads(variables)
+        return json.loads(variables)
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid variables format")
 
+async def load_campaign_files(temp_dir: str, csv_file: UploadFile, variable_list: list, media_file: Optional[UploadFile],
+                              media_archive: Optional[UploadFile] = None):
+    """
+    Save the uploaded contacts CSV, optional media and optional media archive into temp_dir and validate them.
+    Returns (DataFrame, media path or None, archive path or None).
+    """
     if not csv_file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="Uploaded file is not a CSV.")
-    
-    temp_dir = None 
-    try:
-        temp_dir = tempfile.mkdtemp()
-        
-        csv_path = os.path.join(temp_dir, "contacts.csv")
-        with open(csv_path, "wb") as f: 
-            f.write(await csv_file.read())
 
-        # Read and validate CSV, explicitly setting encoding to UTF-8
+    csv_path = os.path.join(temp_dir, "contacts.csv")
+    with open(csv_path, "wb") as f: 
+        f.write(await csv_file.read())
+
+    # Read and validate CSV, explicitly setting encoding to UTF-8
+    with profiling.measure("parse"):
         try:
             df = pd.read_csv(csv_path, encoding='utf-8')
         except UnicodeDecodeError:
@@ -613,39 +708,71 @@ async def send_messages_endpoint(
         except Exception as e:
             raise HTTPException(status_code=422, detail=f"Failed to parse CSV: {e}")
 
-        # Check if required variables exist in CSV columns
-        missing_vars = [var for var in variable_list if var not in df.columns] # Use variable_list here
-        if missing_vars:
-            raise HTTPException(
-                status_code=422,
-                detail=f"Variables not found in CSV: {', '.join(missing_vars)}"
-            )
+    # Check if required variables exist in CSV columns
+    missing_vars = [var for var in variable_list if var not in df.columns] # Use variable_list here
+    if missing_vars:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Variables not found in CSV: {', '.join(missing_vars)}"
+        )
 
-        # Ensure we have at least a phone column (required for WhatsApp)
-        if 'phone' not in df.columns:
-            raise HTTPException(
-                status_code=422,
-                detail="CSV must contain a 'phone' column for WhatsApp messaging"
-            )
+    # Ensure we have at least a phone column (required for WhatsApp)
+    if 'phone' not in df.columns:
+        raise HTTPException(
+            status_code=422,
+            detail="CSV must contain a 'phone' column for WhatsApp messaging"
+        )
 
-        # Save media file if provided
-        media_path = None
-        if media_file:
-            media_path = os.path.join(temp_dir, media_file.filename)
-            with open(media_path, "wb") as f:
-                f.write(await media_file.read())
+    # Save media file if provided
+    media_path = None
+    if media_file:
+        media_path = os.path.join(temp_dir, media_file.filename)
+        with open(media_path, "wb") as f:
+            f.write(await media_file.read())
+
+    # The archive is streamed to disk; members are only extracted one at a time while sending
+    archive_path = None
+    if media_archive:
+        if not media_archive.filename.lower().endswith(".zip"):
+            raise HTTPException(status_code=400, detail="Media archive must be a .zip file.")
+        archive_dir = os.path.join(temp_dir, "archive")
+        os.makedirs(archive_dir, exist_ok=True)
+        archive_path = os.path.join(archive_dir, os.path.basename(media_archive.filename))
+        with open(archive_path, "wb") as f:
+            shutil.copyfileobj(media_archive.file, f, 1024 * 1024)
+
+    return df, media_path, archive_path
+
+async def send_messages(message: str, csv_file: UploadFile, variables: str, media_file: Optional[UploadFile],
+                        media_column: Optional[str], media_archive: Optional[UploadFile],
+                        browser_profile: Optional[str], resend_delivered: bool, campaign_id: Optional[str]):
+    variable_list = parse_variables(variables)
+
+    temp_dir = None 
+    try:
+        temp_dir = tempfile.mkdtemp()
+        df, media_path, archive_path = await load_campaign_files(temp_dir, csv_file, variable_list, media_file, media_archive)
 
         from whatsapp_sender import send_messages_with_variables
         print(f"DEBUG: data frame: {df} Sending messages with template: {message}, variables: {variable_list}, media: {media_path}")
-        send_messages_with_variables(df, message, variable_list, media_path)
+        # Run off the event loop so /campaigns/{id}/stats keeps answering while messages go out
+        summary = await asyncio.to_thread(
+            send_messages_with_variables, df, message, variable_list, media_path, browser_profile, resend_delivered, campaign_id,
+            media_column, archive_path
+        )
 
         return JSONResponse({
             "status": "success", 
-            "detail": f"Successfully sent {len(df)} personalized messages"
+            "detail": f"Successfully sent {summary['sent']} of {len(df)} personalized messages",
+            "summary": summary
         })
 
     except HTTPException:
         raise
+    except MediaReferenceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except CampaignExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"DEBUG: Unexpected error in /send-messages: {e}")
         raise HTTPException(status_code=500, detail=f"Unexpected server error: {e}")
@@ -656,6 +783,132 @@ async def send_messages_endpoint(
             except OSError as e:
                 print(f"DEBUG: Error cleaning up temp directory {temp_dir}: {e}")
 
+@app.post("/send-messages/diff")
+async def send_messages_diff_endpoint(
+    message: str = Form(..., description="Message template with variables like {name}"),
+    csv_file: UploadFile = File(..., description="CSV with contact data"),
+    variables: str = Form(..., description="JSON list of variable names used in template"),
+    media_file: UploadFile = File(None, description="Optional media file to send to all contacts."),
+    media_column: Optional[str] = Form(None, description="CSV column with a per-contact file path or archive.zip:member; per-contact attachments are off unless set"),
+    media_archive: UploadFile = File(None, description="Optional zip of per-contact files referenced by name in the media column")
+):
+    """
+    Dry run of /send-messages: count rows that are new, already delivered or changed since the last delivery
+    """
+    variable_list = parse_variables(variables)
+
+    temp_dir = None
+    try:
+        temp_dir = tempfile.mkdtemp()
+        df, media_path, archive_path = await load_campaign_files(temp_dir, csv_file, variable_list, media_file, media_archive)
+
+        from whatsapp_sender import diff_campaign
+        diff = await asyncio.to_thread(diff_campaign, df, message, variable_list, media_path, media_column, archive_path)
+
+        return JSONResponse({
+            "status": "success",
+            "detail": f"{diff['new']} new, {diff['already_delivered']} already delivered, {diff['changed']} changed",
+            "total_rows": len(df),
+            "diff": diff
+        })
+
+    except HTTPException:
+        raise
+    except MediaReferenceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        print(f"DEBUG: Unexpected error in /send-messages/diff: {e}")
+        raise HTTPException(status_code=500, detail=f"Unexpected server error: {e}")
+    finally:
+        if temp_dir and os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+@app.get("/campaigns")
+async def list_campaigns_endpoint():
+    """List running and recent campaigns, newest first"""
+    from whatsapp_sender import campaign_analytics
+    return {"campaigns": campaign_analytics.list_campaigns()}
+
+@app.get("/campaigns/{campaign_id}/stats")
+async def campaign_stats_endpoint(campaign_id: str):
+    """
+    Outcome and error counts, latency quantiles per stage and throughput for one campaign.
+    Served from running aggregates, so the cost does not depend on campaign size.
+    """
+    from whatsapp_sender import campaign_analytics
+    report = campaign_analytics.campaign_report(campaign_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Campaign '{campaign_id}' not found.")
+    return report
+
+@app.get("/stats/daily")
+async def daily_stats_endpoint(days: int = 7):
+    """Per-day aggregates across all campaigns"""
+    from whatsapp_sender import campaign_analytics
+    return {"days": campaign_analytics.daily_report(days)}
+
+def validate_log_level(level: Optional[str]) -> Optional[str]:
+    if not level:
+        return None
+    if level.upper() not in LEVELS:
+        raise HTTPException(status_code=400, detail=f"Unknown log level '{level}'. Use one of: {', '.join(LEVELS)}")
+    return level.upper()
+
+@app.get("/logs")
+async def logs_endpoint(lines: int = 200, level: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    """
+    Last `lines` log records, or with `since` the records from that time on ("2025-06-06 22:12" or ISO).
+    `level` keeps records at or above it. The returned cursor can be passed to /logs/follow.
+    """
+    level = validate_log_level(level)
+    lines = max(1, min(lines, 5000))
+    if since:
+        return await asyncio.to_thread(log_reader.read_range, since, until, level, lines)
+
+    records = await asyncio.to_thread(log_reader.tail, lines, level, until)
+    return {"lines": records, "cursor": log_reader.cursor()}
+
+@app.get("/logs/follow")
+async def logs_follow_endpoint(file: Optional[str] = None, offset: int = 0, level: Optional[str] = None, timeout: float = 25):
+    """
+    Long-poll for records written after the cursor (file, offset). Returns as soon as there are new
+    records or after `timeout` seconds, with the cursor for the next call. Without a cursor, starts at the end.
+    """
+    level = validate_log_level(level)
+    if not file:
+        cursor = log_reader.cursor()
+        file, offset = cursor["file"], cursor["offset"]
+
+    deadline = time.monotonic() + max(0, min(timeout, 60))
+    while True:
+        result = await asyncio.to_thread(log_reader.follow, file, offset, level)
+        if result["lines"] or time.monotonic() >= deadline or shutdown_event.is_set():
+            return result
+        file, offset = result["cursor"]["file"], result["cursor"]["offset"]
+        await asyncio.sleep(LOG_FOLLOW_POLL_INTERVAL)
+
+@app.get("/profiling")
+async def profiling_status_endpoint():
+    """List recorded profiles and whether profiling is on"""
+    return {"enabled": profiling.enabled, "interval_ms": profiling.PROFILING_INTERVAL_MS, "files": profiling.list_profiles()}
+
+@app.post("/profiling")
+async def profiling_toggle_endpoint(enabled: bool):
+    """
+    Turn sampling profiles of /send-messages, /preview-csv and /check-activation on or off
+    """
+    profiling.enabled = enabled
+    logger.info(f"Profiling {'enabled' if enabled else 'disabled'}. Profiles go to {profiling.profile_dir}")
+    return {"enabled": profiling.enabled}
+
+@app.get("/profiling/files/{name}")
+async def profiling_download_endpoint(name: str):
+    """Download a collapsed-stack profile (flamegraph.pl / speedscope / py-spy raw format)"""
+    path = profiling.profile_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail=f"Profile '{name}' not found.")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -0,0 +1,195 @@
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+import threading
+import zipfile
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+# Base directory for relative paths in the media column; relative paths are rejected when unset
+MEDIA_ROOT = os.environ.get("WA_BOMB_MEDIA_ROOT")
+MAX_MEDIA_MB = float(os.environ.get("MAX_MEDIA_MB", 100))
+
+# Sent through the photo/video input; everything else goes through the document input
+MEDIA_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".mp4", ".mov", ".avi", ".mkv", ".3gp"}
+DOCUMENT_EXTENSIONS = {".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt", ".ods", ".odp", ".rtf",
+                       ".txt", ".csv", ".zip", ".mp3", ".ogg", ".opus", ".m4a", ".aac", ".wav"}
+SUPPORTED_EXTENSIONS = MEDIA_EXTENSIONS | DOCUMENT_EXTENSIONS
+
+ARCHIVE_REFERENCE = re.compile(r"^(.*?\.zip):(.+)$", re.IGNORECASE)
+
+
+class MediaReferenceError(ValueError):
+    """A media column entry that points at a missing, unsupported or unreadable file."""
+
+
+def member_name(name: str) -> str:
+    return re.sub(r"^(\./)+", "", name.replace("\\", "/")).lstrip("/")
+
+
+def split_reference(reference: str) -> tuple:
+    """Returns (path, archive member or None). "C:\\x.pdf" is a path; "x.zip:a/b.pdf" is a member."""
+    match = ARCHIVE_REFERENCE.match(reference)
+    if match:
+        return match.group(1), member_name(match.group(2))
+    return reference, None
+
+
+class MediaLibrary:
+    """
+    Resolves and validates the media column of a campaign at planning time, and stages the files
+    while it runs. Archive members are extracted on demand into a private staging directory, so an
+    uploaded zip of 3,000 invoices is never unpacked up front.
+    """
+
+    def __init__(self, archive_path: str = None, archive_name: str = None, media_root: str = MEDIA_ROOT):
+        self.archive_path = archive_path
+        self.archive_name = archive_name or (os.path.basename(archive_path) if archive_path else None)
+        self.media_root = media_root
+        self.max_bytes = MAX_MEDIA_MB * 1024 * 1024
+        self._archives = {}   # archive path -> ZipFile
+        self._members = {}    # archive path -> {member name: ZipInfo}
+        self._digests = {}    # (path, size, mtime) -> content hash
+        self._staging_dir = None
+        self._lock = threading.Lock()
+
+    def _archive_members(self, path: str) -> dict:
+        if path not in self._members:
+            try:
+                archive = zipfile.ZipFile(path)
+            except (OSError, zipfile.BadZipFile) as e:
+                raise MediaReferenceError(f"cannot open archive {path}: {e}")
+            self._archives[path] = archive
+            self._members[path] = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+        return self._members[path]
+
+    def _locate_archive(self, path: str) -> str:
+        if self.archive_path and os.path.basename(path) == self.archive_name:
+            return self.archive_path
+        return self._locate_file(path)
+
+    def _locate_file(self, path: str) -> str:
+        path = os.path.expanduser(path)
+        if not os.path.isabs(path):
+            if not self.media_root:
+                raise MediaReferenceError(f"relative path {path} needs a media archive upload or WA_BOMB_MEDIA_ROOT")
+            path = os.path.join(self.media_root, path)
+        if not os.path.isfile(path):
+            raise MediaReferenceError(f"file not found: {path}")
+        return path
+
+    def _check(self, name: str, size: int):
+        ext = os.path.splitext(name)[1].lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            raise MediaReferenceError(f"unsupported file type {ext or '(none)'} for {name}")
+        if size == 0:
+            raise MediaReferenceError(f"{name} is empty")
+        if size > self.max_bytes:
+            raise MediaReferenceError(f"{name} is {size / 1024 / 1024:.1f} MB, over the {MAX_MEDIA_MB:.0f} MB limit")
+
+    def _file_digest(self, path: str) -> str:
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._digests:
+            h = hashlib.blake2b(digest_size=16)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            self._digests[key] = h.hexdigest()
+        return self._digests[key]
+
+    def resolve(self, reference: str) -> dict:
+        """
+        Validates one media column entry and returns {"reference", "path", "member", "name", "digest"}.
+        Raises MediaReferenceError if it is missing, of an unsupported type, empty or too large.
+        """
+        path, member = split_reference(str(reference).strip())
+        if member is None and self.archive_path and not os.path.isabs(path):
+            # Bare names refer to the uploaded archive first
+            candidate = member_name(path)
+            if candidate in self._archive_members(self.archive_path):
+                path, member = self.archive_path, candidate
+            elif not self.media_root:
+                raise MediaReferenceError(f"{candidate} not found in {self.archive_name}")
+
+        if member is None:
+            path = self._locate_file(path)
+            self._check(path, os.path.getsize(path))
+            return {"reference": reference, "path": path, "member": None, "name": os.path.basename(path),
+                    "digest": self._file_digest(path)}
+
+        path = self._locate_archive(path)
+        info = self._archive_members(path).get(member)
+        if info is None:
+            raise MediaReferenceError(f"{member} not found in {os.path.basename(path)}")
+        if info.flag_bits & 0x1:
+            raise MediaReferenceError(f"{member} in {os.path.basename(path)} is encrypted")
+        self._check(member, info.file_size)
+        # The stored CRC identifies the content without decompressing every member at planning time
+        return {"reference": reference, "path": path, "member": member, "name": os.path.basename(member),
+                "digest": f"zip-{info.CRC:08x}-{info.file_size}"}
+
+    def stage(self, media: dict, slot: int) -> str:
+        """Returns a local path for `media` that can be handed to the file input."""
+        if media["member"] is None:
+            # Read once so the upload is served from the OS cache (matters on network drives)
+            with open(media["path"], "rb") as f:
+                while f.read(1024 * 1024):
+                    pass
+            return media["path"]
+
+        with self._lock:
+            if self._staging_dir is None:
+                self._staging_dir = tempfile.mkdtemp(prefix="wa_media_")
+        # One directory per slot keeps the original file name, which is what the recipient sees
+        target_dir = os.path.join(self._staging_dir, str(slot))
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, media["name"])
+        archive = self._archives.get(media["path"]) or zipfile.ZipFile(media["path"])
+        self._archives[media["path"]] = archive
+        with archive.open(media["member"]) as source, open(target, "wb") as f:
+            shutil.copyfileobj(source, f, 1024 * 1024)
+        return target
+
+    def release(self, media: dict, staged_path: str):
+        if media["member"] is not None and staged_path:
+            shutil.rmtree(os.path.dirname(staged_path), ignore_errors=True)
+
+    def close(self):
+        for archive in self._archives.values():
+            archive.close()
+        self._archives.clear()
+        if self._staging_dir:
+            shutil.rmtree(self._staging_dir, ignore_errors=True)
+            self._staging_dir = None
+
+
+class MediaPrefetcher:
+    """Stages the next contact's attachment on a worker thread while the current message is sent."""
+
+    def __init__(self, library: MediaLibrary):
+        self.library = library
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="media-prefetch")
+        self._pending = {}   # slot -> (media, future)
+
+    def prefetch(self, slot: int, media: dict):
+        if media is not None and slot not in self._pending:
+            self._pending[slot] = (media, self._executor.submit(self.library.stage, media, slot))
+
+    def get(self, slot: int, media: dict) -> str:
+        """Local path for the slot's attachment, waiting for the prefetch if it is still running."""
+        self.prefetch(slot, media)
+        return self._pending[slot][1].result()
+
+    def release(self, slot: int):
+        media, future = self._pending.pop(slot, (None, None))
+        if future is not None and future.done() and future.exception() is None:
+            self.library.release(media, future.result())
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._pending.clear()
@@ -0,0 +1,62 @@
+import os
+import json
+import time
+import threading
+import logging
+
+# Child of the whatsapp_sender logger, so messages reach its app.log and console handlers
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+
+class InvalidNumberCache:
+    """
+    Persistent negative cache of phone numbers WhatsApp reported as not registered.
+    Entries expire after `ttl_seconds` so a number that joins WhatsApp later gets retried.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read invalid number cache {self.path}: {e}. Starting empty.")
+            return {}
+
+        now = time.time()
+        return {phone: ts for phone, ts in data.items() if now - ts < self.ttl_seconds}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def contains(self, phone: str) -> bool:
+        with self._lock:
+            marked_at = self._entries.get(phone)
+            if marked_at is None:
+                return False
+            if time.time() - marked_at >= self.ttl_seconds:
+                del self._entries[phone]
+                return False
+            return True
+
+    def add(self, phone: str):
+        with self._lock:
+            self._entries[phone] = time.time()
+            try:
+                self._save()
+            except OSError as e:
+                logger.error(f"Could not persist invalid number cache {self.path}: {e}")
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,111 @@
+import os
+import sys
+import shutil
+import logging
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+# Regenerable data Chrome rebuilds on demand. Paths are relative to the user data dir.
+PRUNABLE_CATEGORIES = {
+    "http_cache": ["Default/Cache"],
+    "code_cache": ["Default/Code Cache"],
+    "gpu_cache": ["Default/GPUCache", "GrShaderCache", "GraphiteDawnCache", "ShaderCache",
+                  "Default/DawnCache", "Default/DawnGraphiteCache", "Default/DawnWebGPUCache"],
+    "service_worker_cache": ["Default/Service Worker/CacheStorage"],
+    "safe_browsing": ["Safe Browsing", "Default/Safe Browsing Network"],
+    "crash_reports": ["Crashpad/reports", "Crashpad/completed", "Crashpad/pending"],
+}
+
+# WhatsApp Web keeps its login and keys here. Measured, never pruned.
+PROTECTED_CATEGORIES = {
+    "login_state": ["Default/Local Storage", "Default/IndexedDB", "Default/Session Storage",
+                    "Default/Service Worker/Database", "Default/Cookies"],
+}
+
+
+def _path_size(path: str) -> int:
+    if os.path.isfile(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def measure_profile(profile_dir: str) -> dict:
+    """
+    Returns the profile size in bytes broken down by category, plus "other" and "total".
+    """
+    sizes = {}
+    accounted = 0
+    for category, rel_paths in {**PRUNABLE_CATEGORIES, **PROTECTED_CATEGORIES}.items():
+        size = sum(_path_size(os.path.join(profile_dir, p)) for p in rel_paths)
+        sizes[category] = size
+        accounted += size
+
+    total = _path_size(profile_dir) if os.path.exists(profile_dir) else 0
+    sizes["other"] = max(0, total - accounted)
+    sizes["total"] = total
+    sizes["prunable"] = sum(sizes[c] for c in PRUNABLE_CATEGORIES)
+    return sizes
+
+
+def is_profile_in_use(profile_dir: str) -> bool:
+    """
+    Checks Chrome's own singleton lock, so a browser launched outside this process is noticed too.
+    """
+    if sys.platform == "win32":
+        lock_path = os.path.join(profile_dir, "lockfile")
+        if not os.path.exists(lock_path):
+            return False
+        try:
+            # Chrome holds this file open while running; a stale one can be removed
+            os.remove(lock_path)
+            return False
+        except OSError:
+            return True
+
+    lock_path = os.path.join(profile_dir, "SingletonLock")
+    if not os.path.islink(lock_path):
+        return False
+    try:
+        # Link target is "<hostname>-<pid>"
+        pid = int(os.readlink(lock_path).rsplit("-", 1)[-1])
+        os.kill(pid, 0)
+        return True
+    except (ValueError, ProcessLookupError):
+        return False
+    except OSError:
+        return True
+
+
+def prune_profile(profile_dir: str) -> dict:
+    """
+    Deletes the regenerable caches. Must only be called while no browser uses the profile.
+    Returns the bytes freed per category.
+    """
+    freed = {}
+    for category, rel_paths in PRUNABLE_CATEGORIES.items():
+        freed[category] = 0
+        for rel_path in rel_paths:
+            path = os.path.join(profile_dir, rel_path)
+            if not os.path.exists(path):
+                continue
+            size = _path_size(path)
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+                freed[category] += size
+            except OSError as e:
+                logger.warning(f"Could not prune {path}: {e}")
+    return freed
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import uuid
+import threading
+import logging
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+PROFILING_INTERVAL_MS = float(os.environ.get("PROFILING_INTERVAL_MS", 10))
+MAX_PROFILE_FILES = 50
+
+# Toggled at runtime through /profiling
+enabled = os.environ.get("WA_BOMB_PROFILING", "0") == "1"
+profile_dir = None
+
+# Per-request Server-Timing segments in milliseconds, set by the middleware in main.py
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of every thread at a fixed interval and writes them in the collapsed
+    "frame;frame;frame count" format that py-spy --format raw, flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, name: str, interval_ms: float = PROFILING_INTERVAL_MS):
+        self.name = name
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{name}", daemon=True)
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._started = time.time()
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stops sampling and writes the profile. Returns the file name."""
+        self._stop.set()
+        self._thread.join()
+
+        os.makedirs(profile_dir, exist_ok=True)
+        # Milliseconds plus a random suffix, so concurrent requests never overwrite each other's profile
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self._started))
+        file_name = f"{self.name}-{stamp}-{int(self._started * 1000) % 1000:03d}-{uuid.uuid4().hex[:6]}.folded"
+        with open(os.path.join(profile_dir, file_name), "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        _prune_old_profiles()
+        return file_name
+
+
+def _prune_old_profiles():
+    files = sorted(list_profiles(), key=lambda f: f["modified"])
+    for entry in files[:-MAX_PROFILE_FILES]:
+        try:
+            os.remove(os.path.join(profile_dir, entry["name"]))
+        except OSError:
+            pass
+
+
+def list_profiles() -> list:
+    if not profile_dir or not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for name in os.listdir(profile_dir):
+        if name.endswith(".folded"):
+            stat = os.stat(os.path.join(profile_dir, name))
+            profiles.append({"name": name, "size": stat.st_size, "modified": stat.st_mtime})
+    return sorted(profiles, key=lambda f: f["modified"], reverse=True)
+
+
+def profile_path(name: str) -> str:
+    """Resolves a profile file name, refusing anything outside the profile dir."""
+    if not profile_dir or os.path.basename(name) != name or not name.endswith(".folded"):
+        return None
+    path = os.path.join(profile_dir, name)
+    return path if os.path.isfile(path) else None
+
+
+@contextmanager
+def profiled(name: str):
+    """Profiles the enclosed block when profiling is enabled; a no-op otherwise."""
+    if not enabled or not profile_dir:
+        yield
+        return
+
+    profiler = SamplingProfiler(name)
+    profiler.start()
+    try:
+        yield
+    finally:
+        try:
+            file_name = profiler.stop()
+            logger.info(f"Profile for {name} written to {file_name} ({profiler.samples} samples)")
+        except OSError as e:
+            logger.error(f"Could not write profile for {name}: {e}")
+
+
+def start_request_timing() -> dict:
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def measure(segment: str):
+    """Adds the enclosed block's duration to the current request's Server-Timing segment."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[segment] = timings.get(segment, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def server_timing_header(timings: dict, total_ms: float) -> str:
+    parts = [f"{segment};dur={duration:.1f}" for segment, duration in timings.items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
@@ -1,5 +1,6 @@
 import uvicorn
 import main as fastapi_app # Import your FastAPI app from main.py
+import serving
 import os
 import sys
 import logging
@@ -25,9 +26,11 @@ if not server_logger.handlers:
 
 # Apply uvicorn's log config globally as well, or ensure your main app's loggers are configured.
 # This ensures uvicorn's internal messages also use the desired format.
-logging.config.dictConfig(log_config)
+# uvicorn.Config applies the same config again, so the performance profile leaves it to uvicorn alone.
+if not serving.PERFORMANCE:
+    logging.config.dictConfig(log_config)
 
-server_logger.info(f"Starting FastAPI server on http://{HOST}:{PORT}")
+server_logger.info(f"Starting FastAPI server on http://{HOST}:{PORT} with the {serving.describe()}")
 
 try:
     # Create a Uvicorn server configuration
@@ -37,7 +40,8 @@ try:
         port=PORT,
         log_level="info",
         log_config=log_config,
-        lifespan="on" # Explicitly turn on lifespan management
+        lifespan="on", # Explicitly turn on lifespan management
+        **serving.uvicorn_options() # Event loop, HTTP parser, keep-alive and backlog for FASTAPI_SERVING_PROFILE
     )
 
     # Create a Uvicorn Server instance
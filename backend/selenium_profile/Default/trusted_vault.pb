@@ -1,2 +0,0 @@
-
- a4ccbee239c3ff19dbef6db4c0e58214
\ No newline at end of file
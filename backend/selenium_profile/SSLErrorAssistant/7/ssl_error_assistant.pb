@@ -1,54 +0,0 @@
-5
-3sha256/fjZPHewEHTrMDX3I1ecEIeoy3WFxHyGplOLv28kIbtI=5
-3sha256/m/nBiLhStttu1YmOz7Y3D2u1iB1dV2CbIfFa3R2YW5M=5
-3sha256/8Iuf4xRbVCmCMQTJn3rxlglIO1IOKoyuSUgmXyfaIKs=5
-3sha256/8IHdrS+r6IWzSMcRcD/GA6mBxk1ECX8tGRW0rtGWILE=5
-3sha256/k/2eeJTznE32mblA/du19wpVDSIReFX44M8wXa2JY30=5
-3sha256/urWd7jMwR6DJgvWhp6xfRHF5b/cba3iG0ggXtTR6AfM=5
-3sha256/IJPCDSE5tM9H3nuD5m6RU2i9KDdPXVn4qmC/ULlcZzc=5
-3sha256/0Gy8RMdbxHNWR2GQJ62QKDXORYf5JmMmnr1FJFPYpzM=5
-3sha256/8tTICtyaxIQrdbYYDdgZhTN0OpM9kYndvoImtw1Ys5E=5
-3sha256/F7HIlsaG0bpJW8CzYekRbtFqLVTTGqwvuwPDqnlLct0=5
-3sha256/zaV2Aw1A742R1+WpXWvL5atsJbGmeSS6dzZOfe6f1Yw=5
-3sha256/UwOkRGMlP0K/mKNJdpQ0sTg2ean9Tje8UTOvFYzt1GE=5
-3sha256/w7KUXE4/BAo1YVZdO3mBsrMpu4IQuN0mhUXUI//agVU=5
-3sha256/JnPvGqEn36FjHQlBXtG1uWwNtdMj1o2ojR/asqyypNk=5
-3sha256/AUSXlKDCf1X30WhWeAWbjToABfBkJrKWPL6KwEi5VH0=5
-3sha256/zSyVjjFJMIeXK0ktVTIjewwr6U5OePRqyY/nEXTI4P8=5
-3sha256/9dcHlrXN2WV/ehbEdMxMZ8IV4qvGejCtNC5r6nfTviM=5
-3sha256/E+0WZLGSIe5nddlVKZ5fYzaNHHCE3hNqi/OWZD3iKgA=5
-3sha256/QJ/69CTHYPRa0I3UVlwD6N4MtToxpQ1+0izyGnqEHQo=5
-3sha256/LKtpdq9q7F7msGK0w1+b/gKoDHaQcZKTHIf9PTz2u+U=-
-BadSSL AntivirusBadSSL MITM Software TestF
-Avast Antivirusavast! Web/Mail Shield Rootavast! Web/Mail ShieldK
-Bitdefender Antivirus%Bitdefender Personal CA\.Net-DefenderBitdefender/
-Cisco UmbrellaCisco Umbrella Root CACisco5
-Cisco UmbrellaCisco Umbrella Primary SubCACiscoO
-ContentKeeper"ContentKeeper Appliance CA \(\d+\)ContentKeeper Technologies3
-Cyberoam FirewallCyberoam Certificate Authority1
-
-ForcePointForcepoint Cloud CAForcepoint LLC#
-	FortigateFortiGate CAFortinet
-FortinetFortinet( Ltd\.)?M
-Kaspersky Internet Security.Kaspersky Anti-Virus Personal Root Certificate(
-McAfee Web GatewayMcAfee Web Gateway(
-NetSparkwww\.netspark\.comNetSparkD
-SmoothWall Firewall-Smoothwall-default-root-certificate-authority@
-SonicWall Firewall*HTTPS Management Certificate for SonicWALL+
-SophosSophos SSL CA_[A-Z0-9\-]+Sophos
-SophosSophos_CA_[A-Z0-9]++
-
-Sophos UTMsophosutm Proxy CA	sophosutm8
-Sophos Web ApplianceSophos Web Appliance
-Sophos Plc!
-Symantec Blue CoatBlue Coat.*>
-/Trend Micro InterScan Web Security Suite (IWSS)IWSS\.TREND
-ZscalerZscaler Inc\."@
-3sha256/cH02TnKuUhQx3ZU4l/nEhG1bjDJCmP5T+9StofLRFX8="Mitel(0"@
-3sha256/cH02TnKuUhQx3ZU4l/nEhG1bjDJCmP5T+9StofLRFX8="Mitel(0"@
-3sha256/atuOPgVUYJItFQHLl/lMagLjnI8ndMpAiCW3tYN53BQ="Mitel(0"@
-3sha256/SQtuxr6y1gNHILUUm2spzTVRWYjMFq+FQUiwe5sfihE="Mitel(0"@
-3sha256/71UShHFSMt6S4kbDIzKTYrEySTuxa1ieR3VSC+uHGlY="Mitel(0"@
-3sha256/71UShHFSMt6S4kbDIzKTYrEySTuxa1ieR3VSC+uHGlY="Mitel(0"O
-3sha256/DEPqi83p/DvKFlZkrIIVVn40idU5OgyB4aeRQZkuGVM="Sennheiser HeadSetup(0"O
-3sha256/j1kfeqTcPv6UkMOKRpLJAR7RKPHeWVVpQG13tvofa0w="Sennheiser HeadSetup(0
\ No newline at end of file
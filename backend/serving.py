@@ -0,0 +1,94 @@
+import os
+import decimal
+import importlib.util
+import logging
+
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse as StandardJSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# "default" keeps uvicorn's stock settings; "performance" trades them for lower per-request overhead
+SERVING_PROFILE = os.environ.get("FASTAPI_SERVING_PROFILE", "default")
+SERVING_PROFILES = {"default", "performance"}
+if SERVING_PROFILE not in SERVING_PROFILES:
+    logger.warning(f"Unknown serving profile '{SERVING_PROFILE}', using 'default'")
+    SERVING_PROFILE = "default"
+PERFORMANCE = SERVING_PROFILE == "performance"
+
+GZIP_MIN_BYTES = int(os.environ.get("GZIP_MIN_BYTES", 16 * 1024))
+# The Electron client reuses one connection for its polling; keep it open between polls
+KEEP_ALIVE_SECONDS = int(os.environ.get("FASTAPI_KEEP_ALIVE", 75))
+# Only the local client connects, so a short accept queue is plenty
+LISTEN_BACKLOG = int(os.environ.get("FASTAPI_BACKLOG", 64))
+
+
+def _default(value):
+    """orjson fallback for the pandas and stdlib types that end up in responses."""
+    if hasattr(value, "isoformat"):
+        # pandas.Timestamp, and NaT, which has isoformat() but is not a datetime
+        return value.isoformat() if value == value else None
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if value.__class__.__name__ == "NAType":
+        return None
+    if hasattr(value, "item"):
+        # numpy scalars orjson does not cover, e.g. numpy.float16
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    class FastJSONResponse(StandardJSONResponse):
+        """
+        orjson-backed JSONResponse. NaN and Infinity become null instead of invalid JSON, and NumPy
+        arrays and scalars from DataFrame.to_dict() serialize without a conversion pass.
+        """
+
+        def render(self, content) -> bytes:
+            return orjson.dumps(content, default=_default,
+                                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+else:
+    FastJSONResponse = None
+
+# What main.py uses for explicit and default responses
+JSONResponse = FastJSONResponse if PERFORMANCE and FastJSONResponse is not None else StandardJSONResponse
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def configure_app(app):
+    """Adds the profile's middleware. Called once from main.py after the app is created."""
+    if PERFORMANCE:
+        app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=5)
+
+
+def uvicorn_options() -> dict:
+    """Extra uvicorn.Config arguments for the active profile."""
+    if not PERFORMANCE:
+        return {}
+    return {
+        # uvloop has no Windows build; fall back to the stock asyncio loop there
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "timeout_keep_alive": KEEP_ALIVE_SECONDS,
+        "backlog": LISTEN_BACKLOG,
+        "access_log": False,
+    }
+
+
+def describe() -> str:
+    options = uvicorn_options()
+    if not options:
+        return "default serving profile"
+    return (f"performance serving profile (loop={options['loop']}, http={options['http']}, "
+            f"json={'orjson' if JSONResponse is FastJSONResponse else 'stdlib'}, gzip>={GZIP_MIN_BYTES} bytes)")
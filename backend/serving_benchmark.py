@@ -0,0 +1,193 @@
+"""
+Compares request latency of the default and performance serving profiles (FASTAPI_SERVING_PROFILE).
+Starts run_server.py once per profile on a free local port and drives it over keep-alive connections,
+the way the Electron client does.
+
+    python serving_benchmark.py --requests 2000 --concurrency 4
+    python serving_benchmark.py --profiles performance --csv-rows 5000 --json
+
+Each server runs against a throwaway WA_BOMB_DATA_DIR holding a generated app.log, so the real
+log, its index and campaign stats are never read or touched.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+
+from load_harness import percentile
+
+HOST = "127.0.0.1"
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def build_csv(rows: int) -> bytes:
+    """Contacts with empty cells, so the preview exercises NaN handling."""
+    lines = ["phone,name,order,amount,note"]
+    for i in range(rows):
+        note = "" if i % 3 else f"note {i}"
+        amount = "" if i % 5 == 0 else f"{random.uniform(10, 999):.2f}"
+        lines.append(f"91{random.randint(7000000000, 9999999999)},Contact {i},ORD-{1000 + i},{amount},{note}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def multipart(field: str, filename: str, content: bytes) -> tuple:
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: text/csv\r\n\r\n").encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def write_log(path: str, lines: int):
+    """Fills app.log with records in the format whatsapp_sender.py writes, for /logs to serve."""
+    levels = ["INFO"] * 8 + ["WARNING", "ERROR"]
+    started = time.time() - lines
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(started + i))
+            f.write(f"{stamp},{i % 1000:03d} - {random.choice(levels)} - ⏱️ Sleeping {random.randint(5, 15)}s "
+                    f"before next message {i}...\n")
+
+
+def wait_until_healthy(port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become healthy within {timeout}s")
+
+
+def drive(port: int, requests: list, total: int, concurrency: int) -> dict:
+    """Sends `total` requests spread over `concurrency` keep-alive connections. Returns latencies per endpoint."""
+    latencies = {name: [] for name, *_ in requests}
+    response_bytes = {name: 0 for name, *_ in requests}
+    errors = []
+    lock = threading.Lock()
+
+    def worker(count: int):
+        conn = http.client.HTTPConnection(HOST, port, timeout=30)
+        for i in range(count):
+            name, method, path, body, content_type = requests[i % len(requests)]
+            headers = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+            if content_type:
+                headers["Content-Type"] = content_type
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+                elapsed = time.perf_counter() - started
+            except (OSError, http.client.HTTPException) as e:
+                with lock:
+                    errors.append(f"{name}: {e}")
+                conn.close()
+                conn = http.client.HTTPConnection(HOST, port, timeout=30)
+                continue
+            with lock:
+                if response.status >= 400:
+                    errors.append(f"{name}: HTTP {response.status}")
+                latencies[name].append(elapsed)
+                response_bytes[name] = len(payload)
+        conn.close()
+
+    per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(count,)) for count in per_worker]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name, samples in latencies.items():
+        if samples:
+            endpoints[name] = {
+                "count": len(samples),
+                "p50_ms": round(percentile(samples, 0.5) * 1000, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+                "response_bytes": response_bytes[name],
+            }
+    return {
+        "requests_per_second": round(sum(len(s) for s in latencies.values()) / elapsed, 1),
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "endpoints": endpoints,
+    }
+
+
+def run_profile(profile: str, args, requests: list) -> dict:
+    port = free_port()
+    data_dir = tempfile.mkdtemp(prefix="wa_bomb_serving_")
+    write_log(os.path.join(data_dir, "app.log"), args.log_lines * 2)
+    env = dict(os.environ, FASTAPI_SERVING_PROFILE=profile, FASTAPI_PORT=str(port), FASTAPI_HOST=HOST,
+               WA_BOMB_DATA_DIR=data_dir)
+    server = subprocess.Popen([sys.executable, "run_server.py"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_healthy(port)
+        drive(port, requests, args.warmup, args.concurrency)
+        return drive(port, requests, args.requests, args.concurrency)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def print_report(report: dict):
+    for profile, result in report.items():
+        print(f"\n{profile}: {result['requests_per_second']} req/s, {result['errors']} errors")
+        for error in result["first_errors"]:
+            print(f"  ! {error}")
+        for name, stats in result["endpoints"].items():
+            print(f"  {name:<8} n={stats['count']:<6} p50={stats['p50_ms']:<7} p95={stats['p95_ms']:<7} "
+                  f"p99={stats['p99_ms']:<7} ms  {stats['response_bytes']} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request latency of the FastAPI serving profiles")
+    parser.add_argument("--profiles", default="default,performance", help="comma separated serving profiles to compare")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per profile")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests sent first")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel keep-alive connections")
+    parser.add_argument("--csv-rows", type=int, default=1000, help="rows in the CSV posted to /preview-csv")
+    parser.add_argument("--log-lines", type=int, default=1000, help="lines requested from /logs (a large JSON body)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    csv_body, csv_type = multipart("csv_file", "contacts.csv", build_csv(args.csv_rows))
+    requests = [
+        ("health", "GET", "/health", None, None),
+        ("preview", "POST", "/preview-csv", csv_body, csv_type),
+        ("logs", "GET", f"/logs?lines={args.log_lines}", None, None),
+    ]
+
+    report = {profile: run_profile(profile, args, requests) for profile in args.profiles.split(",")}
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
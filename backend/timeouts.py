@@ -0,0 +1,110 @@
+import os
+import json
+import math
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(f"whatsapp_sender.{__name__}")
+
+
+
+def _stage_bounds(stage: str, default: tuple) -> tuple:
+    """(default, lower, upper) seconds for a stage, overridable as STAGE_TIMEOUT_<STAGE>="default,lower,upper"."""
+    value = os.environ.get(f"STAGE_TIMEOUT_{stage.upper()}")
+    if not value:
+        return default
+    try:
+        bounds = tuple(float(x) for x in value.split(","))
+        if len(bounds) != 3 or not 0 < bounds[1] <= bounds[0] <= bounds[2]:
+            raise ValueError("expected default,lower,upper with 0 < lower <= default <= upper")
+    except ValueError as e:
+        logger.warning(f"Ignoring STAGE_TIMEOUT_{stage.upper()}={value!r}: {e}")
+        return default
+    return bounds
+
+
+# stage: (default seconds, lower bound, upper bound)
+DEFAULT_STAGE_TIMEOUTS = {
+    "login": (60, 20, 180),
+    "chat": (30, 8, 60),
+    "attach": (10, 3, 30),
+    "file_input": (10, 3, 30),
+    "send": (15, 5, 45),
+}
+
+WINDOW_SIZE = 200      # latest samples kept per stage
+MIN_SAMPLES = 10       # below this the default is used
+PERCENTILE = 0.95
+MARGIN_RATIO = 0.5     # timeout = p95 * (1 + MARGIN_RATIO) + MARGIN_SECONDS
+MARGIN_SECONDS = 2.0
+
+
+class StageTimeouts:
+    """
+    Picks each WebDriverWait timeout from the latencies observed for that stage:
+    a high percentile of a rolling window plus a safety margin, clamped to the stage's bounds.
+    Samples are persisted so a fresh backend starts from the last run's numbers.
+    """
+
+    def __init__(self, path: str, stages: dict = None):
+        self.path = path
+        self.stages = stages or {stage: _stage_bounds(stage, bounds) for stage, bounds in DEFAULT_STAGE_TIMEOUTS.items()}
+        self._lock = threading.Lock()
+        self._samples = {stage: deque(maxlen=WINDOW_SIZE) for stage in self.stages}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read stage latency stats {self.path}: {e}. Using defaults.")
+            return
+
+        for stage, samples in data.items():
+            if stage in self._samples:
+                self._samples[stage].extend(float(s) for s in samples)
+
+    def save(self):
+        with self._lock:
+            data = {stage: list(samples) for stage, samples in self._samples.items()}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not persist stage latency stats {self.path}: {e}")
+
+    def record(self, stage: str, seconds: float):
+        """
+        Records how long a stage took. Only successful waits belong here: a timed-out wait would
+        record its own timeout and push the next one up, growing with every repeated failure.
+        """
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def timeout(self, stage: str) -> float:
+        default, lower, upper = self.stages[stage]
+        with self._lock:
+            samples = sorted(self._samples[stage])
+        if len(samples) < MIN_SAMPLES:
+            return default
+
+        rank = min(len(samples) - 1, math.ceil(PERCENTILE * len(samples)) - 1)
+        adaptive = samples[rank] * (1 + MARGIN_RATIO) + MARGIN_SECONDS
+        return max(lower, min(upper, adaptive))
+
+    def samples(self, stage: str) -> list:
+        with self._lock:
+            return list(self._samples[stage])
+
+    def snapshot(self) -> dict:
+        return {
+            stage: {"timeout": round(self.timeout(stage), 2), "samples": len(self._samples[stage])}
+            for stage in self.stages
+        }
@@ -6,23 +6,101 @@ from typing import List
 import sys
 import appdirs
 import logging
+import threading
+import uuid
 from logging.handlers import RotatingFileHandler
 import undetected_chromedriver as uc
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from number_cache import InvalidNumberCache
+from timeouts import StageTimeouts
+import profile_maintenance
+from browser_metrics import ResourceTracker, MemoryWatchdog, get_browser_pid, browser_processes, wait_for_exit, terminate_processes
+import browser_session
+import profiling
+import delivery_index as delivery
+from campaign_stats import CampaignAnalytics
+from media_library import MediaLibrary, MediaPrefetcher, MediaReferenceError, MEDIA_EXTENSIONS
+
+def parse_delay_range(value: str) -> tuple:
+    """"5,15" -> (5, 15); a single value such as "0" means a fixed delay."""
+    try:
+        delays = tuple(int(x) for x in value.split(","))
+    except ValueError:
+        delays = ()
+    if len(delays) == 1:
+        delays *= 2
+    if len(delays) != 2 or not 0 <= delays[0] <= delays[1]:
+        raise ValueError(f"DELAY_BETWEEN_MESSAGES must be 'min,max' or a single number of seconds, got {value!r}")
+    return delays
 
 # App config
 APP_AUTHOR = "YourCompany"
 APP_NAME = "CampaignFlow"
-WHATSAPP_WEB_URL = "https://web.whatsapp.com"
+# Overridable so the sender can run against the local stand-in in fake_whatsapp.py
+WHATSAPP_WEB_URL = os.environ.get("WHATSAPP_WEB_URL", "https://web.whatsapp.com")
 TYPING_SPEED_RANGE = (0.01, 0.05)
-DELAY_BETWEEN_MESSAGES = (5, 15)
-MEDIA_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".mp4", ".mov", ".avi", ".mkv", ".3gp"}
+DELAY_BETWEEN_MESSAGES = parse_delay_range(os.environ.get("DELAY_BETWEEN_MESSAGES", "5,15"))
+INVALID_NUMBER_TTL_DAYS = float(os.environ.get("INVALID_NUMBER_TTL_DAYS", 30))
+# Caches are pruned before launch once they grow past this
+PROFILE_PRUNE_THRESHOLD_MB = float(os.environ.get("PROFILE_PRUNE_THRESHOLD_MB", 200))
+
+# Browser resource profiles: "full" is the classic maximized window, "lean" a small window with
+# unneeded renderer work switched off, "offscreen"/"headless" hide it once WhatsApp is logged in.
+BROWSER_PROFILE = os.environ.get("BROWSER_PROFILE", "full")
+BROWSER_WINDOW_SIZE = os.environ.get("BROWSER_WINDOW_SIZE", "1280,800")
+LEAN_BROWSER_ARGS = [
+    f"--window-size={BROWSER_WINDOW_SIZE}",
+    "--blink-settings=imagesEnabled=false",
+    "--autoplay-policy=user-gesture-required",
+    "--mute-audio",
+    "--disable-smooth-scrolling",
+    "--renderer-process-limit=2",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,CalculateNativeWinOcclusion",
+    # Hidden windows must not be throttled or WhatsApp Web stalls
+    "--disable-renderer-backgrounding",
+    "--disable-background-timer-throttling",
+]
+BROWSER_PROFILES = {
+    "full": ["--start-maximized"],
+    "lean": LEAN_BROWSER_ARGS,
+    "offscreen": LEAN_BROWSER_ARGS + ["--window-position=-32000,-32000"],
+    "headless": LEAN_BROWSER_ARGS,
+}
+HIDDEN_BROWSER_PROFILES = {"offscreen", "headless"}
+
+# Chrome is quit and relaunched between messages once its process tree crosses these (0 disables)
+BROWSER_RSS_LIMIT_MB = float(os.environ.get("BROWSER_RSS_LIMIT_MB", 1500))
+BROWSER_HANDLE_LIMIT = int(os.environ.get("BROWSER_HANDLE_LIMIT", 20000))
+
+# Chrome remote debugging port; 0 picks a free one. A browser that outlives the backend is reattached.
+BROWSER_DEBUG_PORT = int(os.environ.get("BROWSER_DEBUG_PORT", 0))
+# How long maintenance waits for a quit Chrome (and its child processes) to release the profile
+BROWSER_EXIT_TIMEOUT = float(os.environ.get("BROWSER_EXIT_TIMEOUT", 15))
+
+MESSAGE_BOX_XPATH = '//div[@title="Type a message"] | //div[@data-tab="10"]'
+# WhatsApp Web shows this popup instead of a chat when the number isn't registered
+INVALID_NUMBER_XPATH = '//div[@role="dialog"]//*[contains(text(), "invalid")] | //div[contains(text(), "Phone number shared via url is invalid")]'
+INVALID_NUMBER_OK_XPATH = '//div[@role="dialog"]//button'
+ATTACH_BUTTON_XPATH = '//button[@title="Attach"] | //div[@title="Attach"] | //span[@data-icon="clip"]'
+SEND_BUTTON_XPATH = '//div[@role="button" and @aria-label="Send"]'
+LOGGED_IN_XPATH = '//div[@contenteditable="true"]'
+QR_CODE_XPATH = '//canvas[@aria-label="Scan me!"] | //div[@data-ref]'
+QR_SCAN_TIMEOUT = 60
+
+# Outcomes returned by send_whatsapp_message_enhanced
+SEND_OK = "sent"
+SEND_INVALID_NUMBER = "invalid_number"
+SEND_FAILED = "failed"
 
 # Logging setup
-LOG_FILE_PATH = os.path.join(appdirs.user_data_dir(APP_NAME, APP_AUTHOR), "app.log")
+APP_DATA_DIR = os.environ.get("WA_BOMB_DATA_DIR") or appdirs.user_data_dir(APP_NAME, APP_AUTHOR)
+LOG_FILE_PATH = os.path.join(APP_DATA_DIR, "app.log")
 os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
 
 logger = logging.getLogger(__name__)
@@ -39,9 +117,35 @@ logger.addHandler(console_handler)
 def safe_print(message):
     logger.info(message)
 
-USER_DATA_DIR = os.path.join(appdirs.user_data_dir(APP_NAME, APP_AUTHOR), "selenium_profile")
+USER_DATA_DIR = os.path.join(APP_DATA_DIR, "selenium_profile")
 os.makedirs(USER_DATA_DIR, exist_ok=True)
 
+INVALID_NUMBERS_PATH = os.path.join(APP_DATA_DIR, "invalid_numbers.json")
+invalid_numbers = InvalidNumberCache(INVALID_NUMBERS_PATH, INVALID_NUMBER_TTL_DAYS * 24 * 3600)
+
+DELIVERY_INDEX_PATH = os.path.join(APP_DATA_DIR, "delivery_index.bin")
+delivery_index = delivery.DeliveryIndex(DELIVERY_INDEX_PATH)
+
+CAMPAIGN_STATS_PATH = os.path.join(APP_DATA_DIR, "campaign_stats.json")
+campaign_analytics = CampaignAnalytics(CAMPAIGN_STATS_PATH)
+
+# Stage latencies and error class of the message in flight; one campaign runs at a time under browser_lock
+message_trace = {"stages": {}, "error": None}
+
+STAGE_LATENCY_PATH = os.path.join(APP_DATA_DIR, "stage_latency.json")
+stage_timeouts = StageTimeouts(STAGE_LATENCY_PATH)
+
+# Held for as long as a driver owned by this process is alive
+browser_lock = threading.Lock()
+
+BROWSER_SESSION_PATH = os.path.join(APP_DATA_DIR, "browser_session.json")
+
+# Lives inside the profile so /logout's rmtree clears it along with the session
+LOGIN_MARKER_PATH = os.path.join(USER_DATA_DIR, "wa_login_completed")
+
+class LoginRequiredError(Exception):
+    """WhatsApp Web wants a QR scan but the browser window is hidden."""
+
 def human_typing(element, text: str):
     for char in text:
         if char == "\n":
@@ -58,48 +162,398 @@ def replace_variables_in_message(message_template: str, row_data: dict, variable
         personalized_message = personalized_message.replace(placeholder, value)
     return personalized_message
 
+def normalize_phone(phone) -> str:
+    return str(phone).strip().replace(" ", "").replace("+", "")
+
+def get_contact_name(row) -> str:
+    return next((str(row[field]) for field in ["name", "fullName", "full_name", "firstName", "first_name"]
+                 if field in row and pd.notna(row[field])), "Friend")
+
+def resolve_media_column(df: pd.DataFrame, media_column: str = None) -> str:
+    """
+    The per-contact media column, only when one was requested: a CSV that merely has a "media"
+    column may use it as a plain text variable.
+    """
+    if not media_column:
+        return None
+    if media_column not in df.columns:
+        raise MediaReferenceError(f"Media column '{media_column}' not found in CSV")
+    return media_column
+
+def plan_campaign(df: pd.DataFrame, message_template: str, variables: List[str], media_hash: str = "",
+                  skip_delivered: bool = True, media_library: MediaLibrary = None, media_column: str = None):
+    """
+    Resolves every row up front into the contacts to message and the rows to skip,
+    so nothing that is known to fail or was already delivered ever opens a chat.
+    Every per-contact attachment is validated here; any bad reference fails the whole plan.
+    """
+    planned = []
+    skipped = []
+    media_errors = []
+    for index, row in df.iterrows():
+        phone = normalize_phone(row.get("phone", ""))
+        if not phone.isdigit():
+            skipped.append({"row": index, "phone": phone, "reason": "invalid_format"})
+            continue
+        if invalid_numbers.contains(phone):
+            skipped.append({"row": index, "phone": phone, "reason": "not_on_whatsapp"})
+            continue
+
+        media = None
+        if media_column and pd.notna(row[media_column]) and str(row[media_column]).strip():
+            try:
+                media = media_library.resolve(row[media_column])
+            except MediaReferenceError as e:
+                media_errors.append(f"row {index}: {e}")
+                continue
+        row_media_hash = media["digest"] if media else media_hash
+
+        message = replace_variables_in_message(message_template, row.to_dict(), variables)
+        delivery_status = delivery_index.classify(phone, message, row_media_hash)
+        if delivery_status == delivery.DELIVERED and skip_delivered:
+            skipped.append({"row": index, "phone": phone, "reason": delivery.DELIVERED})
+            continue
+
+        planned.append({
+            "row": index,
+            "phone": phone,
+            "contact_name": get_contact_name(row),
+            "message": message,
+            "media": media,
+            "media_hash": row_media_hash,
+            "delivery_status": delivery_status,
+        })
+
+    if media_errors:
+        shown = "; ".join(media_errors[:10])
+        more = f" (and {len(media_errors) - 10} more)" if len(media_errors) > 10 else ""
+        raise MediaReferenceError(f"{len(media_errors)} invalid media references: {shown}{more}")
+    return planned, skipped
+
+def diff_campaign(df: pd.DataFrame, message_template: str, variables: List[str], media_path: str = None,
+                  media_column: str = None, media_archive: str = None) -> dict:
+    """
+    Dry run: how many rows are new, already delivered, or changed since the last delivery to that phone.
+    """
+    media_hash = delivery.file_digest(media_path) if media_path and os.path.exists(media_path) else ""
+    media_library = MediaLibrary(media_archive)
+    try:
+        planned, skipped = plan_campaign(df, message_template, variables, media_hash, skip_delivered=False,
+                                         media_library=media_library, media_column=resolve_media_column(df, media_column))
+    finally:
+        media_library.close()
+
+    diff = {delivery.NEW: 0, delivery.DELIVERED: 0, delivery.CHANGED: 0, "skipped": {}}
+    for entry in planned:
+        diff[entry["delivery_status"]] += 1
+    for entry in skipped:
+        diff["skipped"][entry["reason"]] = diff["skipped"].get(entry["reason"], 0) + 1
+    diff["to_send"] = diff[delivery.NEW] + diff[delivery.CHANGED]
+    return diff
+
+def wait_stage(driver, stage: str, condition, record: bool = True):
+    """
+    WebDriverWait with the adaptive timeout for `stage`. Successful waits feed the stage's latency
+    window unless record is False; timeouts only show up in the message trace.
+    """
+    timeout = stage_timeouts.timeout(stage)
+    started = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout).until(condition)
+    except TimeoutException:
+        message_trace["stages"][stage] = timeout
+        raise
+    elapsed = time.monotonic() - started
+    if record:
+        stage_timeouts.record(stage, elapsed)
+    message_trace["stages"][stage] = elapsed
+    return result
+
+def wait_for_chat(driver):
+    """
+    Waits until either the message composer or WhatsApp's invalid number popup shows up,
+    whichever comes first. Returns ("composer" | "invalid", element).
+    """
+    def _probe(d):
+        invalid = d.find_elements(By.XPATH, INVALID_NUMBER_XPATH)
+        if invalid:
+            return "invalid", invalid[0]
+        boxes = d.find_elements(By.XPATH, MESSAGE_BOX_XPATH)
+        if boxes:
+            return "composer", boxes[0]
+        return False
+
+    return wait_stage(driver, "chat", _probe)
+
+def wait_for_login(driver, allow_qr: bool = True, record: bool = True):
+    """
+    Waits for WhatsApp Web to load. Only the time to reach either the chat list or the QR code
+    feeds the adaptive "login" timeout; a human scanning the QR code gets the fixed QR_SCAN_TIMEOUT.
+    Raises LoginRequiredError if a QR code shows up and allow_qr is False. Pass record=False for a
+    tab that was already loaded, whose near-zero wait says nothing about a cold start.
+    """
+    def _probe(d):
+        if d.find_elements(By.XPATH, LOGGED_IN_XPATH):
+            return "logged_in"
+        if d.find_elements(By.XPATH, QR_CODE_XPATH):
+            return "qr"
+        return False
+
+    if wait_stage(driver, "login", _probe, record) == "qr":
+        if os.path.exists(LOGIN_MARKER_PATH):
+            os.remove(LOGIN_MARKER_PATH)
+        if not allow_qr:
+            raise LoginRequiredError("WhatsApp Web needs a QR code scan")
+        safe_print("📷 Waiting for QR code scan…")
+        WebDriverWait(driver, QR_SCAN_TIMEOUT).until(EC.presence_of_element_located((By.XPATH, LOGGED_IN_XPATH)))
+
+    if not os.path.exists(LOGIN_MARKER_PATH):
+        with open(LOGIN_MARKER_PATH, "w") as f:
+            f.write(time.strftime("%Y-%m-%d %H:%M:%S"))
+
+def dismiss_invalid_number_popup(driver):
+    try:
+        driver.find_element(By.XPATH, INVALID_NUMBER_OK_XPATH).click()
+    except Exception:
+        pass
+
+def resolve_browser_profile(requested: str = None) -> str:
+    profile = requested or BROWSER_PROFILE
+    if profile not in BROWSER_PROFILES:
+        safe_print(f"⚠️ Unknown browser profile '{profile}', using 'full'.")
+        profile = "full"
+    if profile in HIDDEN_BROWSER_PROFILES and not os.path.exists(LOGIN_MARKER_PATH):
+        safe_print(f"👀 WhatsApp login not completed yet, using a visible 'lean' window instead of '{profile}'.")
+        profile = "lean"
+    return profile
+
+def create_driver(profile: str = "full"):
+    options = uc.ChromeOptions()
+    options.add_argument(f"--user-data-dir={USER_DATA_DIR}")
+    options.add_argument("--no-first-run")
+    options.add_argument("--no-default-browser-check")
+    options.add_argument("--disable-popup-blocking")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    for arg in BROWSER_PROFILES[profile]:
+        options.add_argument(arg)
+    port = browser_session.allocate_debug_port(BROWSER_DEBUG_PORT)
+    options.debugger_address = f"{browser_session.DEBUG_HOST}:{port}"
+
+    started = time.monotonic()
+    driver = uc.Chrome(options=options, user_data_dir=USER_DATA_DIR, headless=(profile == "headless"))
+    safe_print(f"🚀 Chrome started in {time.monotonic() - started:.1f}s ({profile} profile)")
+
+    # Record the address chromedriver actually connected to so a restarted backend can find it
+    debugger_address = driver.capabilities.get("goog:chromeOptions", {}).get("debuggerAddress", options.debugger_address)
+    port = int(debugger_address.rsplit(":", 1)[-1])
+    browser_session.save_session(BROWSER_SESSION_PATH, port, get_browser_pid(driver), USER_DATA_DIR, profile)
+    return driver
+
+def attach_driver(session: dict):
+    """
+    Connects to a Chrome left running by a previous backend process instead of launching a new one.
+    """
+    options = webdriver.ChromeOptions()
+    options.debugger_address = f"{browser_session.DEBUG_HOST}:{session['port']}"
+
+    started = time.monotonic()
+    patcher = uc.Patcher()
+    patcher.auto()
+    driver = webdriver.Chrome(service=Service(patcher.executable_path), options=options)
+    driver.browser_pid = session.get("pid")
+    # chromedriver's quit() leaves a browser it attached to running; quit_driver closes it itself
+    driver.attached = True
+    safe_print(f"🔗 Reattached to running Chrome on port {session['port']} in {time.monotonic() - started:.1f}s")
+    return driver
+
+def quit_driver(driver):
+    attached = getattr(driver, "attached", False)
+    processes = browser_processes(get_browser_pid(driver)) if attached else []
+    closed = False
+    if attached:
+        try:
+            driver.execute_cdp_cmd("Browser.close", {})
+            closed = True
+        except Exception as e:
+            logger.warning(f"Could not close reattached Chrome over CDP: {e}")
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Error while quitting Chrome: {e}")
+
+    if attached:
+        if processes:
+            closed = wait_for_exit(processes, BROWSER_EXIT_TIMEOUT) or terminate_processes(processes)
+        if not closed:
+            # Keep the session record so the next campaign reattaches instead of colliding with this browser
+            safe_print(f"⚠️ Reattached Chrome (pid {driver.browser_pid}) may still be running; it will be reused next time.")
+            return
+    browser_session.clear_session(BROWSER_SESSION_PATH)
+
+def open_whatsapp(profile: str, reuse_running: bool = True):
+    """
+    Gets a driver logged into WhatsApp Web: reattaches to a surviving browser on our profile if there
+    is one, otherwise launches Chrome. If a hidden browser lands on the QR code, it is relaunched as
+    a visible window. Returns (driver, profile actually used).
+    """
+    session = browser_session.find_running_browser(BROWSER_SESSION_PATH, USER_DATA_DIR) if reuse_running else None
+    driver = None
+    if session:
+        try:
+            driver = attach_driver(session)
+            profile = session.get("profile", profile)
+        except Exception as e:
+            safe_print(f"⚠️ Could not reattach to running Chrome ({e}). Launching a new one.")
+            browser_session.clear_session(BROWSER_SESSION_PATH)
+    if driver is None:
+        driver = create_driver(profile)
+
+    try:
+        already_open = driver.current_url.startswith(WHATSAPP_WEB_URL)
+        if already_open:
+            # Reattached to a loaded WhatsApp Web tab; reloading would force a full re-sync
+            safe_print("🔓 WhatsApp Web is already open.")
+        else:
+            safe_print("🔓 Opening WhatsApp Web. Please scan QR code if not already logged in…")
+            driver.get(WHATSAPP_WEB_URL)
+        wait_for_login(driver, allow_qr=profile not in HIDDEN_BROWSER_PROFILES, record=not already_open)
+    except LoginRequiredError:
+        close_browser(driver)
+        safe_print("🔑 WhatsApp session has expired. Reopening a visible window for the QR code.")
+        return open_whatsapp("lean", reuse_running=False)
+    except Exception:
+        quit_driver(driver)
+        raise
+
+    safe_print("✅ Logged into WhatsApp Web.")
+    return driver, profile
+
+def wait_for_browser_exit(processes: list) -> bool:
+    """
+    quit() only signals Chrome; its processes keep writing to the profile while they shut down.
+    Waits for the snapshot to exit and for Chrome's profile lock to go away.
+    """
+    deadline = time.monotonic() + BROWSER_EXIT_TIMEOUT
+    if not wait_for_exit(processes, BROWSER_EXIT_TIMEOUT):
+        return False
+    while profile_maintenance.is_profile_in_use(USER_DATA_DIR):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.2)
+    return True
+
+def browser_alive(driver) -> bool:
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+def close_browser(driver):
+    """
+    Quits the driver and waits for Chrome to release the profile, so a relaunch on the same
+    --user-data-dir does not hand off to the still-exiting browser. Stragglers are terminated.
+    """
+    processes = browser_processes(get_browser_pid(driver))
+    quit_driver(driver)
+    if not wait_for_browser_exit(processes):
+        safe_print(f"⚠️ Chrome did not exit within {BROWSER_EXIT_TIMEOUT:.0f}s; terminating it before relaunching.")
+        terminate_processes(processes)
+
+def measure_startup_time() -> float:
+    """Launches and quits Chrome on the profile and waits until it has exited. Caller must hold browser_lock."""
+    started = time.monotonic()
+    driver = create_driver(resolve_browser_profile())
+    elapsed = time.monotonic() - started
+    processes = browser_processes(get_browser_pid(driver))
+    quit_driver(driver)
+    if not wait_for_browser_exit(processes):
+        raise RuntimeError(f"Chrome did not exit within {BROWSER_EXIT_TIMEOUT:.0f}s after measuring startup. Try again.")
+    return elapsed
+
+def maintain_profile(measure_startup: bool = False) -> dict:
+    """
+    Prunes regenerable caches from the Selenium profile. Refuses to run while a browser uses it.
+    """
+    if not browser_lock.acquire(blocking=False):
+        raise RuntimeError("A campaign is using the browser. Try again once it has finished.")
+    try:
+        if profile_maintenance.is_profile_in_use(USER_DATA_DIR):
+            raise RuntimeError("Chrome is still running with the WhatsApp profile. Close it and try again.")
+
+        report = {"before": profile_maintenance.measure_profile(USER_DATA_DIR)}
+        if measure_startup:
+            report["startup_seconds_before"] = round(measure_startup_time(), 2)
+            if profile_maintenance.is_profile_in_use(USER_DATA_DIR):
+                raise RuntimeError("Chrome is still running with the WhatsApp profile. Close it and try again.")
+
+        report["freed"] = profile_maintenance.prune_profile(USER_DATA_DIR)
+        report["after"] = profile_maintenance.measure_profile(USER_DATA_DIR)
+        if measure_startup:
+            report["startup_seconds_after"] = round(measure_startup_time(), 2)
+
+        safe_print(f"🧹 Pruned {sum(report['freed'].values()) / 1024 / 1024:.1f} MB of browser caches from the profile.")
+        return report
+    finally:
+        browser_lock.release()
+
+def prune_profile_if_needed():
+    """Called with browser_lock held, right before launching Chrome."""
+    if profile_maintenance.is_profile_in_use(USER_DATA_DIR):
+        return
+    prunable = profile_maintenance.measure_profile(USER_DATA_DIR)["prunable"]
+    if prunable > PROFILE_PRUNE_THRESHOLD_MB * 1024 * 1024:
+        freed = profile_maintenance.prune_profile(USER_DATA_DIR)
+        safe_print(f"🧹 Pruned {sum(freed.values()) / 1024 / 1024:.1f} MB of browser caches before launch.")
+
 def send_whatsapp_message_enhanced(driver, phone: str, personalized_message: str, contact_name: str, media_path: str = None):
-    url = f"https://web.whatsapp.com/send?phone={phone}&text&app_absent=0"
+    url = f"{WHATSAPP_WEB_URL}/send?phone={phone}&text&app_absent=0"
     driver.get(url)
     safe_print(f"📱 Opening chat with {phone} ({contact_name})...")
 
     try:
-        message_box_xpath = '//div[@title="Type a message"] | //div[@data-tab="10"]'
-        message_box = WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.XPATH, message_box_xpath)))
+        kind, message_box = wait_for_chat(driver)
+        if kind == "invalid":
+            safe_print(f"🚫 {phone} ({contact_name}) is not on WhatsApp. Skipping and remembering it.")
+            invalid_numbers.add(phone)
+            dismiss_invalid_number_popup(driver)
+            return SEND_INVALID_NUMBER
+
+        if media_path and not os.path.exists(media_path):
+            safe_print(f"❌ Media file {media_path} is missing. Not sending the text without it.")
+            message_trace["error"] = "MediaUnavailable"
+            return SEND_FAILED
 
         human_typing(message_box, personalized_message)
 
-        if media_path and os.path.exists(media_path):
+        if media_path:
             ext = os.path.splitext(media_path)[1].lower()
             safe_print(f"📎 Attaching media: {media_path}")
 
             attach_button = None
-            for xpath in [
-                '//button[@title="Attach"]',
-                '//div[@title="Attach"]',
-                '//span[@data-icon="clip"]'
-            ]:
-                try:
-                    attach_button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, xpath)))
-                    break
-                except:
-                    continue
+            try:
+                attach_button = wait_stage(driver, "attach", EC.element_to_be_clickable((By.XPATH, ATTACH_BUTTON_XPATH)))
+            except TimeoutException:
+                pass
 
             if not attach_button:
-                safe_print("❌ Could not find attach button. Sending message without media.")
-                message_box.send_keys(Keys.ENTER)
-                return
+                # Counting a text-only send as delivered would suppress the document on every re-run
+                safe_print("❌ Could not find attach button. Not sending the text without its media.")
+                message_box.send_keys(Keys.CONTROL, "a")
+                message_box.send_keys(Keys.DELETE)
+                message_trace["error"] = "AttachButtonMissing"
+                return SEND_FAILED
 
             attach_button.click()
             time.sleep(1)
 
             file_input_xpath = '//input[@accept="image/*,video/mp4,video/3gpp,video/quicktime"]' if ext in MEDIA_EXTENSIONS else '//input[@accept="*"]'
-            file_input = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, file_input_xpath)))
+            file_input = wait_stage(driver, "file_input", EC.presence_of_element_located((By.XPATH, file_input_xpath)))
             file_input.send_keys(media_path)
             time.sleep(2)
 
-            send_button_xpath = '//div[@role="button" and @aria-label="Send"]'
-            send_btn = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.XPATH, send_button_xpath)))
+            send_btn = wait_stage(driver, "send", EC.element_to_be_clickable((By.XPATH, SEND_BUTTON_XPATH)))
             driver.execute_script("arguments[0].scrollIntoView(true);", send_btn)
             time.sleep(0.5)
             send_btn.click()
@@ -107,58 +561,146 @@ def send_whatsapp_message_enhanced(driver, phone: str, personalized_message: str
             message_box.send_keys(Keys.ENTER)
 
         safe_print(f"✅ Message sent to {contact_name} ({phone})")
+        return SEND_OK
 
     except Exception as e:
         safe_print(f"❌ Error sending to {phone}: {e}")
-
-def send_messages_with_variables(df: pd.DataFrame, message_template: str, variables: List[str], media_path: str = None):
-    options = uc.ChromeOptions()
-    options.add_argument(f"--user-data-dir={USER_DATA_DIR}")
-    options.add_argument("--no-first-run")
-    options.add_argument("--no-default-browser-check")
-    options.add_argument("--disable-popup-blocking")
-    options.add_argument("--start-maximized")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--disable-extensions")
-    options.add_argument("--remote-debugging-port=9222")
-
+        message_trace["error"] = type(e).__name__
+        return SEND_FAILED
+
+def send_messages_with_variables(df: pd.DataFrame, message_template: str, variables: List[str], media_path: str = None,
+                                 browser_profile: str = None, resend_delivered: bool = False, campaign_id: str = None,
+                                 media_column: str = None, media_archive: str = None):
+    """
+    media_path goes to every contact. media_column names a CSV column with a per-contact file path or
+    "archive.zip:member" reference (overriding media_path for that row); bare names are looked up in
+    media_archive, an uploaded zip. Raises MediaReferenceError before anything is sent if a reference is bad.
+    """
+    media_library = MediaLibrary(media_archive)
     try:
-        driver = uc.Chrome(options=options, user_data_dir=USER_DATA_DIR)
-
-        safe_print("🔓 Opening WhatsApp Web. Please scan QR code if not already logged in…")
-        driver.get(WHATSAPP_WEB_URL)
-
-        WebDriverWait(driver, 60).until(EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"]')))
-        safe_print("✅ Logged into WhatsApp Web.")
-
-        for index, row in df.iterrows():
-            phone_raw = str(row.get("phone", "")).strip().replace(" ", "").replace("+", "")
-            if not phone_raw.isdigit():
-                safe_print(f"⚠️ Skipping invalid phone number: {phone_raw}")
-                continue
-
-            contact_name = next((str(row[field]) for field in ["name", "fullName", "full_name", "firstName", "first_name"]
-                                 if field in row and pd.notna(row[field])), "Friend")
-
-            row_dict = row.to_dict()
-            personalized_message = replace_variables_in_message(message_template, row_dict, variables)
-
-            send_whatsapp_message_enhanced(driver, phone_raw, personalized_message, contact_name, media_path)
+        with profiling.measure("render"):
+            media_hash = delivery.file_digest(media_path) if media_path and os.path.exists(media_path) else ""
+            planned, skipped = plan_campaign(df, message_template, variables, media_hash, skip_delivered=not resend_delivered,
+                                             media_library=media_library, media_column=resolve_media_column(df, media_column))
+        return start_campaign(df, planned, skipped, media_path, media_library, browser_profile, campaign_id)
+    finally:
+        media_library.close()
+
+def start_campaign(df: pd.DataFrame, planned: list, skipped: list, media_path: str, media_library: MediaLibrary,
+                   browser_profile: str, campaign_id: str) -> dict:
+    campaign_id = campaign_id or uuid.uuid4().hex[:12]
+    summary = {"campaign_id": campaign_id, SEND_OK: 0, SEND_INVALID_NUMBER: 0, SEND_FAILED: 0, "skipped": len(skipped), "recycles": 0}
+    campaign_analytics.start_campaign(campaign_id, len(df), len(planned), skipped)
+    for entry in skipped:
+        safe_print(f"⚠️ Skipping {entry['phone']} (row {entry['row']}): {entry['reason']}")
+
+    if not planned:
+        safe_print("ℹ️ Nothing to send after planning.")
+        campaign_analytics.finish_campaign(campaign_id)
+        return summary
+
+    with browser_lock, profiling.measure("browser"):
+        prune_profile_if_needed()
+        status = run_campaign(campaign_id, planned, media_path, summary, resolve_browser_profile(browser_profile),
+                              MediaPrefetcher(media_library))
+    campaign_analytics.finish_campaign(campaign_id, status)
+    return summary
+
+def run_campaign(campaign_id: str, planned: list, media_path: str, summary: dict, browser_profile: str,
+                 prefetcher: MediaPrefetcher) -> str:
+    """
+    Sends the planned messages and returns the campaign's final status. Per-contact attachments are
+    staged one message ahead by `prefetcher`, so extraction overlaps the current send.
+    """
+    try:
+        driver, browser_profile = open_whatsapp(browser_profile)
+        safe_print(f"⏲️ Stage timeouts: {stage_timeouts.snapshot()}")
+
+        resources = ResourceTracker(browser_profile)
+        resources.start(get_browser_pid(driver))
+        watchdog = MemoryWatchdog(BROWSER_RSS_LIMIT_MB, BROWSER_HANDLE_LIMIT)
+
+        def recycle_browser(old_driver, reason: str, position: int):
+            nonlocal browser_profile
+            safe_print(f"♻️ Recycling browser at message {position}/{len(planned)}: {reason}")
+            close_browser(old_driver)
+            new_driver, browser_profile = open_whatsapp(browser_profile, reuse_running=False)
+            resources.start(get_browser_pid(new_driver))
+            summary["recycles"] += 1
+            safe_print("♻️ Browser recycled.")
+            return new_driver
+
+        for position, entry in enumerate(planned, start=1):
+            message_trace["stages"] = {}
+            message_trace["error"] = None
+            message_started = time.monotonic()
+            try:
+                attachment = prefetcher.get(position, entry["media"]) if entry["media"] else media_path
+            except Exception as e:
+                # Changed or removed since planning; never send the text without its document
+                safe_print(f"❌ Could not stage {entry['media']['reference']} for {entry['phone']}: {e}")
+                attachment = None
+                message_trace["error"] = "MediaUnavailable"
+            if position < len(planned):
+                prefetcher.prefetch(position + 1, planned[position]["media"])
+            for attempt in (1, 2):
+                try:
+                    if message_trace["error"]:
+                        outcome = SEND_FAILED
+                    else:
+                        outcome = send_whatsapp_message_enhanced(driver, entry["phone"], entry["message"], entry["contact_name"], attachment)
+                    if outcome == SEND_OK:
+                        delivery_index.record(entry["phone"], entry["message"], entry["media_hash"])
+                    sample = resources.message_done(get_browser_pid(driver))
+                    recycle_reason = watchdog.check(sample)
+                    if sample:
+                        safe_print(f"🧠 Browser RSS {sample['rss'] / 1024 / 1024:.0f} MB, {sample['handles']} handles, "
+                                   f"{sample['processes']} processes after message {position}/{len(planned)}")
+                    if (sample is None or outcome == SEND_FAILED) and not browser_alive(driver):
+                        # Crashed mid-send (usually out of memory); the next row must not hit the dead browser
+                        recycle_reason = "browser stopped responding"
+                    break
+                except WebDriverException as e:
+                    # Raised before the chat opened, so the message was never attempted: retry it on a new browser
+                    safe_print(f"❌ Browser failure while opening the chat with {entry['phone']}: {e}")
+                    outcome = SEND_FAILED
+                    message_trace["error"] = "BrowserFailure"
+                    recycle_reason = "browser stopped responding"
+                    if attempt == 2:
+                        break
+                    driver = recycle_browser(driver, recycle_reason, position)
+                    recycle_reason = None
+                    message_trace["stages"] = {}
+                    message_trace["error"] = None
+                    safe_print(f"🔁 Retrying message {position}/{len(planned)} on the new browser.")
+            prefetcher.release(position)
+            summary[outcome] += 1
+            campaign_analytics.record_message(campaign_id, outcome, time.monotonic() - message_started,
+                                              message_trace["stages"], message_trace["error"])
+
+            if recycle_reason and position < len(planned):
+                driver = recycle_browser(driver, recycle_reason, position)
 
             sleep_time = random.randint(*DELAY_BETWEEN_MESSAGES)
             safe_print(f"⏱️ Sleeping {sleep_time}s before next message...\n")
             time.sleep(sleep_time)
 
-        safe_print("🎉 All messages sent successfully!")
+        summary["resources"] = resources.summary()
+        safe_print(f"📊 Browser resources: {summary['resources']}")
+        safe_print(f"🎉 Campaign finished: {summary}")
+        return "finished"
 
     except Exception as e:
         safe_print(f"❌ Error in message sending process: {e}")
         logger.exception("Full traceback for error:")
+        return "aborted"
     finally:
         if 'driver' in locals() and driver:
-            driver.quit()
+            quit_driver(driver)
+        prefetcher.close()
+        stage_timeouts.save()
 
-def send_messages_from_dataframe(df: pd.DataFrame, message_template: str, media_path: str = None):
+def send_messages_from_dataframe(df: pd.DataFrame, message_template: str, media_path: str = None, browser_profile: str = None):
     import re
     variables = re.findall(r'\{([^}]+)\}', message_template)
-    send_messages_with_variables(df, message_template, variables, media_path)
+    return send_messages_with_variables(df, message_template, variables, media_path, browser_profile)